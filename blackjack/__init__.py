@@ -0,0 +1 @@
+from .core import Card, Deck, CompositionDeck, Hand, SideBets, GameSetup
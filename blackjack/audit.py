@@ -0,0 +1,73 @@
+from collections import namedtuple
+
+from .solver import EVSolver
+
+Mistake = namedtuple('Mistake', ['playerCards', 'upcard', 'action', 'best', 'bet', 'loss'])
+
+def situation_evs(solver, playerCards, upcard, options):
+    # The EVs of the actions on offer, which the best play is chosen from, and of every action that can be priced,
+    # so a choice the GUI allowed off the menu (a double on three cards) is scored with what it really returned
+    evs = solver.action_evs(playerCards, upcard, anyHand=True)
+    return {action: ev for action, ev in evs.items() if action in options}, evs
+
+def audit_decisions(setup, decisions, solver=None, worst=10):
+    # decisions are (bet, playerCards, upcard, options, action) with cards as solver values in the order dealt.
+    # Each distinct situation is solved once and every solve shares one EVSolver, so a hand that was hit finds
+    # its EVs already worked out by the solve of its first two cards, and dealer outcomes are reused throughout.
+    solver = solver or EVSolver(setup)
+    situations = {}
+    for bet, playerCards, upcard, options, action in decisions:
+        key = (tuple(sorted(playerCards[:2])) + tuple(sorted(playerCards[2:])), upcard, tuple(sorted(options)))
+        situations.setdefault(key, []).append((bet, action))
+    mistakes = []
+    byAction = {}
+    total = 0
+    unpriced = 0  # Decisions whose action the solver has no EV for, left out of the mistakes
+    for (playerCards, upcard, options), choices in sorted(situations.items()):
+        evs, allEvs = situation_evs(solver, playerCards, upcard, options)
+        best = max(evs, key=evs.get)
+        for bet, action in choices:
+            total += 1
+            if action not in allEvs:
+                unpriced += 1
+                continue
+            loss = (evs[best] - allEvs[action]) * bet
+            if loss > 1e-12:
+                mistakes.append(Mistake(playerCards, upcard, action, best, bet, loss))
+                entry = byAction.setdefault((action, best), [0, 0.0])
+                entry[0] += 1
+                entry[1] += loss
+    mistakes.sort(key=lambda mistake: mistake.loss, reverse=True)
+    return {
+        'decisions': total,
+        'situations': len(situations),
+        'mistakes': len(mistakes),
+        'unpriced': unpriced,
+        'ev_lost': sum(mistake.loss for mistake in mistakes),
+        'worst': mistakes[:worst],
+        'by_action': sorted(((action, best, count, loss) for (action, best), (count, loss) in byAction.items()), key=lambda row: -row[3]),
+    }
+
+def format_cards(playerCards):
+    return ' '.join('A' if value == 1 else str(value) for value in playerCards)
+
+def format_audit(report):
+    lines = [
+        f"Decisions: {report['decisions']} in {report['situations']} distinct situations",
+        f"Mistakes: {report['mistakes']}",
+        f"EV lost: {report['ev_lost']:.2f}",
+    ]
+    if report['unpriced']:
+        lines.append(f"Decisions that could not be priced: {report['unpriced']}")
+    if report['by_action']:
+        lines.append("")
+        lines.append(f"{'Played':<11}{'Instead of':<12}{'Times':>7}{'EV lost':>10}")
+        for action, best, count, loss in report['by_action']:
+            lines.append(f"{action:<11}{best:<12}{count:>7}{loss:>10.2f}")
+    if report['worst']:
+        lines.append("")
+        lines.append(f"{'Hand':<14}{'Upcard':>7}  {'Played':<11}{'Best':<11}{'Bet':>8}{'EV lost':>10}")
+        for mistake in report['worst']:
+            lines.append(f"{format_cards(mistake.playerCards):<14}{format_cards([mistake.upcard]):>7}  {mistake.action:<11}"
+                         f"{mistake.best:<11}{mistake.bet:>8.1f}{mistake.loss:>10.3f}")
+    return "\n".join(lines)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import pickle
+import random
+import tempfile
+
+from .simulation import iter_rounds, new_deck
+from .solver import parallel_strategy_table, strategy_table
+from .stats import SimulationStats
+from .strategy import basic_strategy
+
+CACHE_VERSION = 7  # Bump when a change to the game engine makes old results wrong
+
+def default_cache_dir():
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'blackjack')
+
+class ResultCache:
+    # Entries are files named <key>.<rounds>.pickle, where the key hashes everything except the round count,
+    # so a request for more rounds can find a shorter run of the same game and carry on from where it stopped
+    def __init__(self, path=None, maxBytes=512 * 1024 * 1024):
+        self.path = path or default_cache_dir()
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.extensions = 0
+        os.makedirs(self.path, exist_ok=True)
+
+    def key(self, kind, setup, seed=None, **extra):
+        inputs = {'version': CACHE_VERSION, 'kind': kind, 'rules': setup.rules(), 'seed': seed, **extra}
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+    def filename(self, key, rounds):
+        return os.path.join(self.path, f"{key}.{rounds}.pickle")
+
+    def rounds_stored(self, key):
+        rounds = []
+        for name in os.listdir(self.path):
+            parts = name.split('.')
+            if len(parts) == 3 and parts[0] == key and parts[2] == 'pickle':
+                rounds.append(int(parts[1]))
+        return sorted(rounds)
+
+    def load(self, key, rounds):
+        filename = self.filename(key, rounds)
+        try:
+            with open(filename, 'rb') as f:
+                value = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.utime(filename)  # Modification time doubles as the last use time for eviction
+        return value
+
+    def get(self, key, rounds=0):
+        value = self.load(key, rounds)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def nearest(self, key, rounds):
+        # The longest stored run that is not longer than the request
+        shorter = [stored for stored in self.rounds_stored(key) if stored <= rounds]
+        for stored in reversed(shorter):
+            value = self.load(key, stored)
+            if value is not None:
+                return stored, value
+        return 0, None
+
+    def put(self, key, value, rounds=0):
+        # Write to a temporary file in the same directory and rename it, so readers never see a partial entry
+        descriptor, temporary = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+        try:
+            with os.fdopen(descriptor, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.filename(key, rounds))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.path):
+            if name.endswith('.pickle'):
+                status = os.stat(os.path.join(self.path, name))
+                entries.append((status.st_mtime, status.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            try:
+                os.unlink(os.path.join(self.path, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+def cached_simulation(cache, setup, rounds, seed, policy=basic_strategy):
+    key = cache.key('simulate', setup, seed, policy=policy.__name__)
+    entry = cache.get(key, rounds)
+    if entry is not None:
+        return entry['stats']
+    stored, entry = cache.nearest(key, rounds)
+    if entry is None:
+        random.seed(seed)
+        deck = new_deck(setup)
+        stats = SimulationStats()
+    else:
+        # Carry on with the random state and shoe the shorter run ended with, giving the same result as a fresh run
+        cache.extensions += 1
+        random.setstate(entry['random_state'])
+        deck = entry['deck']
+        stats = entry['stats']
+    for result in iter_rounds(setup, rounds - stored, policy=policy, deck=deck):
+        stats.add(result)
+    cache.put(key, {'stats': stats, 'random_state': random.getstate(), 'deck': deck}, rounds)
+    return stats
+
+def cached_strategy_table(cache, setup, workers=None):
+    # A table solved on worker processes is the same table, so both share one entry
+    key = cache.key('strategy', setup)
+    table = cache.get(key)
+    if table is None:
+        table = parallel_strategy_table(setup, workers) if workers else strategy_table(setup)
+        cache.put(key, table)
+    return table
@@ -0,0 +1,699 @@
+import argparse
+import subprocess
+import sys
+import time
+
+from .core import GameSetup, Hand
+from .strategy import POLICIES
+
+def parse_odds(text):
+    odds = text.split(':')
+    return float(odds[0]) / float(odds[1])
+
+def add_shoe_arguments(parser):
+    parser.add_argument('--decks', type=int, default=6, help="number of decks in the shoe")
+    parser.add_argument('--penetration', type=float, default=0.75, help="fraction of the shoe dealt before reshuffling")
+    parser.add_argument('--csm', action='store_true', help="return discards to the shoe after every round")
+    parser.add_argument('--composition', action='store_true', help="track rank counts instead of dealing real cards")
+    parser.add_argument('--infinite', action='store_true', help="deal from an infinite deck")
+    parser.add_argument('--csm-shelves', type=int, default=38, help="shelves in the continuous shuffling machine")
+    parser.add_argument('--csm-shelf-size', type=int, default=0, help="cards per shelf (default: fit the shoe)")
+    parser.add_argument('--csm-buffer', type=int, default=10, help="discards held back before they are shuffled in")
+
+def add_rule_arguments(parser):
+    add_shoe_arguments(parser)
+    parser.add_argument('--h17', action='store_true', help="dealer hits soft 17")
+    parser.add_argument('--no-surrender', action='store_true', help="play without late surrender")
+    parser.add_argument('--no-insurance', action='store_true', help="play without insurance")
+    parser.add_argument('--payout', type=parse_odds, default=1.5, help="blackjack payout odds, e.g. 3:2 or 6:5")
+
+def add_cache_arguments(parser):
+    parser.add_argument('--cache', action='store_true', help="reuse (and extend) earlier results for the same rules and seed")
+    parser.add_argument('--cache-dir', default=None, help="cache location (default: ~/.cache/blackjack)")
+
+def shoe_setup_from_args(args):
+    setup = GameSetup()
+    setup.playerChooseNumDecks = args.decks
+    setup.deckPenetration = args.penetration
+    setup.autoReshuffle = args.csm
+    setup.csmShelves = args.csm_shelves
+    setup.csmShelfSize = args.csm_shelf_size
+    setup.csmBufferSize = args.csm_buffer
+    setup.compositionShoe = args.composition
+    setup.infiniteDeck = args.infinite
+    return setup
+
+def setup_from_args(args):
+    setup = shoe_setup_from_args(args)
+    setup.dealerStandOnSoft17 = not args.h17
+    setup.playWithSurrender = not args.no_surrender
+    setup.playWithInsurance = not args.no_insurance
+    setup.payoutOdds = args.payout
+    return setup
+
+def play_command(args):
+    from .gui import main as gui_main  # Tkinter is only imported when the GUI is actually wanted
+    gui_main()
+
+def check_simulate_args(args):
+    # Rejects options that the run the other options pick would ignore
+    parser = args.parser
+    given = lambda name: getattr(args, name) != parser.get_default(name)
+    modes = [flag for flag, name in (('--jsonl', 'jsonl'), ('--store', 'store'), ('--history', 'history'), ('--cache', 'cache'),
+                                     ('--tables', 'tables'), ('--precision', 'precision')) if given(name)]
+    if len(modes) > 1:
+        parser.error(f"{' and '.join(modes)} cannot be combined")
+    mode = modes[0] if modes else None
+    for flag, name, allowed in (
+        ('--records', 'records', ('--jsonl',)),
+        ('--chunk-size', 'chunk_size', ('--jsonl',)),
+        ('--workers', 'workers', ('--tables', '--precision')),
+        ('--metrics-port', 'metrics_port', ('--tables', '--precision')),
+        ('--confidence', 'confidence', ('--precision',)),
+        ('--chunk-rounds', 'chunk_rounds', ('--precision',)),
+        ('--max-rounds', 'max_rounds', ('--precision',)),
+        ('--cache-dir', 'cache_dir', ('--cache',)),
+    ):
+        if given(name) and mode not in allowed:
+            parser.error(f"{flag} only applies with {' or '.join(allowed)}")
+    if mode == '--precision' and given('rounds'):
+        parser.error("--precision plays until the target is met; use --max-rounds to cap it")
+
+def simulate_command(args):
+    from .simulation import simulate
+    check_simulate_args(args)
+    setup = setup_from_args(args)
+    if args.jsonl:
+        stream_command(args, setup)
+        return
+    if args.store:
+        store_simulation(args, setup)
+        return
+    if args.history:
+        history_simulation(args, setup)
+        return
+    start = time.perf_counter()
+    if args.cache:
+        if args.seed is None:
+            sys.exit("--cache needs a --seed so the result can be reproduced")
+        from .cache import ResultCache, cached_simulation
+        result = cached_simulation(ResultCache(args.cache_dir), setup, args.rounds, args.seed).summary()
+    elif args.precision or args.tables:
+        result = chunked_simulation(args, setup)
+    else:
+        result = simulate(setup, args.rounds, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"Rounds played: {result['rounds']}")
+    print(f"Net result: {result['net']:+.1f} units")
+    print(f"Player edge: {result['ev'] * 100:+.3f}% (+/- {1.96 * result['stderr'] * 100:.3f}%)")
+    print(f"Rounds per second: {result['rounds'] / elapsed:.0f}")
+    if args.precision:
+        print(f"Target: +/- {args.precision}% at {args.confidence * 100:g}% confidence, wall time {elapsed:.1f} s")
+
+def chunked_simulation(args, setup):
+    from statistics import NormalDist
+    from .simulation import simulate_tables, simulate_to_precision
+    monitor = telemetry = None
+    if args.metrics_port is not None:
+        from .telemetry import RunMonitor, Telemetry
+        telemetry = Telemetry()
+        if args.precision:
+            # Rounds the target needs, from the spread seen so far
+            z = NormalDist().inv_cdf((1 + args.confidence) / 2)
+            target = lambda stats: stats.net.variance * (z * 100 / args.precision) ** 2
+        else:
+            target = args.rounds
+        monitor = RunMonitor(telemetry, target)
+        port = telemetry.serve(args.metrics_port)
+        print(f"Metrics at http://127.0.0.1:{port}/metrics", file=sys.stderr)
+    try:
+        if args.precision:
+            stats, reached = simulate_to_precision(setup, args.precision / 100, args.seed or 0, args.confidence, args.chunk_rounds,
+                                                   args.workers, args.max_rounds, progress=monitor)
+            if not reached:
+                print(f"Stopped at --max-rounds before reaching +/- {args.precision}%", file=sys.stderr)
+        else:
+            stats = simulate_tables(setup, args.rounds, args.seed or 0, args.tables, args.workers, progress=monitor)
+    finally:
+        if telemetry:
+            telemetry.close()
+    return stats.summary()
+
+def stream_command(args, setup):
+    from .streaming import stream_simulation
+    records = None
+    if args.records == '-':
+        records = sys.stdout
+    elif args.records:
+        records = open(args.records, 'w')
+    try:
+        stream_simulation(setup, args.rounds, sys.stdout, args.chunk_size, args.seed, records=records)
+    finally:
+        if records not in (None, sys.stdout):
+            records.close()
+
+def store_simulation(args, setup):
+    from .simulation import iter_rounds
+    from .store import ColumnWriter
+    start = time.perf_counter()
+    with ColumnWriter(args.store) as writer:
+        for result in iter_rounds(setup, args.rounds, seed=args.seed):
+            writer.add(result)
+    print(f"Wrote {args.rounds} rounds to {args.store} in {time.perf_counter() - start:.1f} s")
+
+def history_simulation(args, setup):
+    import random
+    from .session import SessionStore, ShoeRecorder
+    from .simulation import iter_rounds, new_deck
+    store = SessionStore(args.history, batchRounds=100000)
+    start = time.perf_counter()
+    random.seed(args.seed)
+    deck = new_deck(setup)
+    ShoeRecorder(store, deck)  # Every shoe dealt goes into the history too, for the replay command
+    store.add_results(iter_rounds(setup, args.rounds, deck=deck), setup.initialBankroll)
+    store.close()
+    print(f"Added {args.rounds} rounds to {args.history} in {time.perf_counter() - start:.1f} s")
+
+def history_command(args):
+    from .session import SessionStore
+    store = SessionStore(args.path)
+    start = time.perf_counter()
+    summary = store.situation(args.total, args.type, args.upcard, args.min_count, args.max_count)
+    elapsed = time.perf_counter() - start
+    print_action_summary(summary)
+    print(f"Query time: {elapsed * 1000:.1f} ms")
+    store.close()
+
+def store_command(args):
+    from .store import ColumnStore
+    store = ColumnStore(args.path)
+    print_action_summary(store.summary(upcard=args.upcard, playerTotal=args.total, minCount=args.min_count, maxCount=args.max_count))
+
+def print_action_summary(summary):
+    print(f"{'Action':<12}{'Rounds':>12}{'Net':>14}{'EV':>10}")
+    for action, row in summary.items():
+        print(f"{action:<12}{row['rounds']:>12}{row['net']:>+14.1f}{row['ev']:>+10.4f}")
+
+def shoe_depths(setup, deck, shoes, roundCards=5):
+    # Yields how many cards into its shoe the next card is, then draws it. A shuffling machine has no shoes, so
+    # there a shoe is as many cards as a dealt shoe would give, and every roundCards cards go back into the
+    # machine as a round's discards would.
+    cardsPerShoe = int(setup.playerChooseNumDecks * 52 * setup.deckPenetration)
+    drawn = []
+    for _ in range(shoes):
+        if not setup.autoReshuffle:
+            deck.shuffle_deck()
+        for dealt in range(cardsPerShoe):
+            yield dealt
+            drawn.append(deck.draw_card())
+            if setup.autoReshuffle and len(drawn) == roundCards:
+                deck.add_to_discard_pile(drawn)
+                deck.return_discard_pile_to_deck()
+                drawn.clear()
+
+def sidebets_command(args):
+    import random
+    from .sidebets import SIDE_BET_NAMES, SideBetOdds
+    from .simulation import new_deck
+    from .stats import RunningStats
+    if args.seed is not None:
+        random.seed(args.seed)
+    setup = shoe_setup_from_args(args)
+    deck = new_deck(setup)
+    odds = SideBetOdds(deck)
+    evs = {name: RunningStats() for name in SIDE_BET_NAMES}
+    positive = dict.fromkeys(SIDE_BET_NAMES, 0)
+    for _ in shoe_depths(setup, deck, args.shoes):
+        for name, ev in odds.evs().items():
+            evs[name].add(ev)
+            if ev > 0:
+                positive[name] += 1
+    print(f"{'Side bet':<16}{'Mean EV':>10}{'Best EV':>10}{'Cards +EV':>12}")
+    for name, label in SIDE_BET_NAMES.items():
+        print(f"{label:<16}{evs[name].mean * 100:>+9.2f}%{evs[name].maximum * 100:>+9.2f}%{positive[name] / evs[name].count * 100:>11.2f}%")
+
+def insurance_command(args):
+    import random
+    from .simulation import new_deck
+    from .stats import RunningStats
+    if args.seed is not None:
+        random.seed(args.seed)
+    setup = shoe_setup_from_args(args)
+    deck = new_deck(setup)
+    cardsPerShoe = int(setup.playerChooseNumDecks * 52 * setup.deckPenetration)
+    depths = [RunningStats() for _ in range(args.buckets)]
+    positive = [0] * args.buckets
+    for dealt in shoe_depths(setup, deck, args.shoes):
+        ev = deck.insurance_ev()
+        bucket = dealt * args.buckets // cardsPerShoe
+        depths[bucket].add(ev)
+        positive[bucket] += ev > 0
+    print(f"{'Depth':<14}{'Mean EV':>10}{'Best EV':>10}{'Cards +EV':>12}")
+    for bucket, stats in enumerate(depths):
+        depth = f"{bucket / args.buckets * 100:.0f}-{(bucket + 1) / args.buckets * 100:.0f}%"
+        print(f"{depth:<14}{stats.mean * 100:>+9.2f}%{stats.maximum * 100:>+9.2f}%{positive[bucket] / stats.count * 100:>11.2f}%")
+
+def audit_command(args):
+    from .audit import audit_decisions, format_audit
+    from .session import SessionStore
+    store = SessionStore(args.path)
+    setup = GameSetup()
+    store.load_setup(setup)
+    sessions = store.sessions()
+    if not sessions:
+        sys.exit("No decisions have been saved yet")
+    decisions = store.decisions(None if args.all else sessions[-1])
+    store.close()
+    start = time.perf_counter()
+    report = audit_decisions(setup, decisions, worst=args.worst)
+    print(format_audit(report))
+    print(f"Audit time: {time.perf_counter() - start:.1f} s")
+
+def replay_command(args):
+    from .replay import SHOE_RULES, replay
+    from .session import SessionStore
+    # Every shoe is dealt again as it was recorded, so nothing that changes the shoe itself can be replayed
+    for flag, name in (('--decks', 'decks'), ('--csm', 'csm'), ('--composition', 'composition'), ('--infinite', 'infinite'),
+                       ('--csm-shelves', 'csm_shelves'), ('--csm-shelf-size', 'csm_shelf_size'), ('--csm-buffer', 'csm_buffer')):
+        if getattr(args, name) != args.parser.get_default(name):
+            args.parser.error(f"{flag} cannot be replayed, as recorded shoes keep the cards they were dealt with")
+    for name, _ in args.versus or ():
+        if name in SHOE_RULES:
+            args.parser.error(f"--versus {name} cannot be replayed, as recorded shoes keep the cards they were dealt with")
+    store = SessionStore(args.path)
+    sessions = store.shoe_sessions()
+    if not sessions:
+        sys.exit("No shoes have been recorded yet")
+    shoes = store.shoes(None if args.all else sessions[-1])
+    store.close()
+    setupA = setup_from_args(args)
+    setupB = GameSetup.from_rules(setupA.rules())
+    for name, value in args.versus or ():
+        setattr(setupB, name, value)
+    start = time.perf_counter()
+    result = replay(shoes, setupA, setupB, POLICIES[args.policy], POLICIES[args.versus_policy], args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Shoes replayed: {result['shoes']}, rounds A: {result['rounds_a']}, B: {result['rounds_b']}")
+    print(f"Player edge A: {result['edge_a'] * 100:+.3f}%  B: {result['edge_b'] * 100:+.3f}%")
+    print(f"A - B: {result['difference'] * 100:+.3f}% (+/- {1.96 * result['stderr'] * 100:.3f}%)")
+    print(f"Rounds per second: {(result['rounds_a'] + result['rounds_b']) / elapsed:.0f}")
+
+def session_command(args):
+    from .session import SessionStore
+    store = SessionStore(args.path)
+    summary = store.summary()
+    print(f"Bankroll: {summary['bankroll']}")
+    print(f"Rounds played: {summary['rounds']}, wagered {summary['wagered']:.1f}, net {summary['net']:+.1f}")
+    for row in store.recent_rounds(args.recent):
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(row['time']))}  bet {row['bet']:>8.1f}  net {row['net']:>+8.1f}  "
+              f"bankroll {row['bankroll']:>9.1f}  {row['playerTotal']} v {row['upcard']} {row['action']}")
+    store.close()
+
+def csm_command(args):
+    import math
+    import random
+    from .simulation import new_deck, play_round
+    from .stats import RunningStats
+    from .strategy import basic_strategy
+    print(f"{'Shoe':<10}{'Rounds/s':>10}{'Shuffles':>10}{'TC sd':>8}{'TC >= +2':>10}{'Player edge':>13}")
+    for continuous in (False, True):
+        setup = setup_from_args(args)
+        setup.autoReshuffle = continuous
+        if args.seed is not None:
+            random.seed(args.seed)
+        deck = new_deck(setup)
+        shuffles = deck.shuffles
+        counts = RunningStats()
+        nets = RunningStats()
+        favourable = 0
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            result = play_round(setup, deck, basic_strategy)
+            counts.add(result.count)
+            nets.add(result.net)
+            favourable += result.count >= 2
+        elapsed = time.perf_counter() - start
+        shuffles = deck.shuffles - shuffles
+        print(f"{'CSM' if continuous else 'Shoe':<10}{args.rounds / elapsed:>10.0f}{shuffles:>10}"
+              f"{math.sqrt(counts.variance):>8.2f}{favourable / args.rounds * 100:>9.2f}%"
+              f"{nets.mean * 100:>+12.3f}%")
+
+def whatif_command(args):
+    import random
+    import tempfile
+    from .simulation import hand_options, new_deck, play_round
+    from .snapshot import WhatIfPool, has_order
+    from .strategy import basic_strategy
+    setup = setup_from_args(args)
+    random.seed(args.seed)
+    deck = new_deck(setup)
+    for _ in range(args.played):
+        play_round(setup, deck, basic_strategy)
+    while True:
+        # Deals in the same order as a round, until the player has a decision to make
+        playerCards = [deck.draw_card()]
+        dealerCards = [deck.draw_card()]
+        playerCards.append(deck.draw_card())
+        dealerCards.append(deck.draw_card())
+        hand = Hand()
+        dealerHand = Hand()
+        for card in playerCards:
+            hand.add_card(card)
+        for card in dealerCards:
+            dealerHand.add_card(card)
+        if not (hand.is_blackjack() or dealerHand.is_blackjack()):
+            break
+        deck.add_to_discard_pile(playerCards + dealerCards)
+    options = hand_options(setup, hand, 1)
+    print(f"Hand: {' '.join(card.rank for card in playerCards)} against {dealerCards[1].rank}, true count {deck.true_count():+.2f}")
+    pool = WhatIfPool(setup, args.workers)
+    try:
+        start = time.perf_counter()
+        evs = pool.evaluate(deck, playerCards, dealerCards, options, args.trials, args.seed)
+        elapsed = time.perf_counter() - start
+        replayed = pool.evaluate(deck, playerCards, dealerCards, options, replay=True) if has_order(deck) else None
+        start = time.perf_counter()
+        for _ in range(100):
+            pool.snapshot.write(deck, dealerCards[:1])
+        written = (time.perf_counter() - start) / 100
+    finally:
+        pool.close()
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        for _ in range(100):
+            deck.save_deck(f"{directory}/shoe.pkl")
+        saved = (time.perf_counter() - start) / 100
+    print(f"{'Action':<11}{'EV':>9}{'+/-':>8}{'Real shoe':>11}")
+    for action in sorted(options, key=lambda action: -evs[action].mean):
+        real = f"{replayed[action].mean:>+11.1f}" if replayed else f"{'-':>11}"
+        print(f"{action:<11}{evs[action].mean:>+9.4f}{1.96 * evs[action].stderr:>8.4f}{real}")
+    print(f"Played out {args.trials} shoes per action in {elapsed:.2f} s")
+    print(f"Snapshot write: {written * 1e6:.0f} us, save_deck: {saved * 1e6:.0f} us")
+
+def shoe_command(args):
+    from .simulation import new_deck, shoe_rounds, table_seed
+    setup = setup_from_args(args)
+    if setup.autoReshuffle or setup.infiniteDeck:
+        sys.exit("A shuffling machine or an infinite deck never starts a new shoe")
+    deck = new_deck(setup, table_seed(args.seed, args.table))
+    deck.deal_shoe(args.shoe)
+    print(f"Table {args.table} shoe {args.shoe} of seed {args.seed}, first cards: "
+          f"{' '.join(deck.draw_card().rank for _ in range(args.cards))}")
+    net = 0
+    for number, result in enumerate(shoe_rounds(setup, args.seed, args.table, args.shoe)):
+        net += result.net
+        print(f"{number:>4}  {result.playerTotal:>2} v {result.upcard:<2}  {result.action:<10}{result.net:>+6.1f}  true count {result.count:+.2f}")
+    print(f"Net over the shoe: {net:+.1f}")
+
+def parse_rule(text):
+    import json
+    name, _, value = text.partition('=')
+    if name not in GameSetup.ruleNames:
+        raise argparse.ArgumentTypeError(f"unknown rule {name}, expected one of {', '.join(GameSetup.ruleNames)}")
+    try:
+        return name, json.loads(value.lower() if value.lower() in ('true', 'false') else value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"cannot read the value of {text}")
+
+def compare_command(args):
+    from .compare import compare
+    setupA = setup_from_args(args)
+    setupB = GameSetup.from_rules(setupA.rules())
+    for name, value in args.versus or ():
+        setattr(setupB, name, value)
+    start = time.perf_counter()
+    result = compare(setupA, setupB, args.rounds, args.seed, POLICIES[args.policy], POLICIES[args.versus_policy],
+                     args.unit_rounds, args.antithetic, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Rounds per variant: {result['rounds']} in {result['units']} paired units")
+    print(f"Player edge A: {result['edge_a'] * 100:+.3f}%  B: {result['edge_b'] * 100:+.3f}%")
+    print(f"A - B: {result['difference'] * 100:+.3f}% (+/- {1.96 * result['stderr'] * 100:.3f}%)")
+    print(f"Separate runs would give +/- {1.96 * result['independent_stderr'] * 100:.3f}%, "
+          f"needing {result['rounds_saved']:.1f} times the rounds for the same interval")
+    print(f"Time: {elapsed:.1f} s")
+
+def tracking_command(args):
+    from .tracking import ShuffleModel, analyze_tracking
+    unknown = [step for step in args.steps if step not in ('riffle', 'strip', 'cut')]
+    if unknown:
+        sys.exit(f"Unknown shuffle steps: {', '.join(unknown)} (expected riffle, strip or cut)")
+    model = ShuffleModel(args.steps, args.clump, strip=args.strip, trackerCuts=not args.no_tracker_cut)
+    start = time.perf_counter()
+    result = analyze_tracking(model, args.shoes, args.decks, args.penetration, args.seed, args.slug, args.spread,
+                              args.base_edge / 100, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Shuffle: {', '.join(args.steps)} (clumps of {args.clump:g}, strips of {args.strip})")
+    print(f"Shoes: {result['shoes']}, slug of {args.slug} cards, bet spread 1-{args.spread}")
+    print(f"Slug span true count: {result['slug_true_count']:+.2f}, reached the dealt cards in {result['reached'] * 100:.1f}% of shoes")
+    print(f"Tracker edge: {result['edge'] * 100:+.3f}% (+/- {1.96 * result['stderr'] * 100:.3f}%)")
+    print(f"Random slug control: {result['control_edge'] * 100:+.3f}% (+/- {1.96 * result['control_stderr'] * 100:.3f}%)")
+    print(f"Edge gained by tracking: {result['gain'] * 100:+.3f}%")
+    print(f"Shoes per second: {result['shoes'] / elapsed:.0f}")
+
+def parse_list(convert):
+    return lambda text: [convert(item) for item in text.split(',')]
+
+def parse_flag(text):
+    if text.lower() in ('yes', 'y', 'true', '1'):
+        return True
+    if text.lower() in ('no', 'n', 'false', '0'):
+        return False
+    raise argparse.ArgumentTypeError(f"expected yes or no, got {text}")
+
+def sweep_command(args):
+    from .sweep import format_sweep_table, run_sweep
+    ranges = {
+        'playerChooseNumDecks': args.decks,
+        'deckPenetration': args.penetration,
+        'dealerStandOnSoft17': args.stand_soft17,
+        'playWithSurrender': args.surrender,
+        'playWithInsurance': args.insurance,
+        'payoutOdds': args.payout,
+        'autoReshuffle': args.csm,
+    }
+    def progress(row):
+        print(f"Finished {row['rules']} in {row['rounds']} rounds", file=sys.stderr)
+    rows = run_sweep(ranges, args.rounds, args.output, args.seed, args.workers, progress)
+    print(format_sweep_table(rows))
+
+def solve_command(args):
+    from .solver import EVSolver, format_strategy_table, strategy_table
+    setup = setup_from_args(args)
+    if args.hand:
+        from .solver import card_value
+        from .core import Card
+        playerValues = [card_value(Card(rank, '')) for rank in args.hand]
+        upcard = card_value(Card(args.upcard, ''))
+        action, evs = EVSolver(setup).best_action(playerValues, upcard)
+        for name, ev in sorted(evs.items(), key=lambda item: -item[1]):
+            print(f"{name:<10}{ev:+.4f}")
+        print(f"Best action: {action}")
+    elif args.cache:
+        from .cache import ResultCache, cached_strategy_table
+        print(format_strategy_table(cached_strategy_table(ResultCache(args.cache_dir), setup, args.workers)))
+    elif args.workers:
+        from .solver import parallel_strategy_table
+        print(format_strategy_table(parallel_strategy_table(setup, args.workers)))
+    else:
+        print(format_strategy_table(strategy_table(setup)))
+
+def bench_command(args):
+    from .simulation import allocation_check, simulate
+    # Each import runs in a fresh interpreter, which also reports whether the import pulled in Tk
+    command = [sys.executable, '-c', "import sys, time; start = time.perf_counter(); import blackjack; "
+               "print(time.perf_counter() - start, 'tkinter' in sys.modules or '_tkinter' in sys.modules)"]
+    runs = [subprocess.run(command, capture_output=True, text=True, check=True).stdout.split() for _ in range(args.repeat)]
+    print(f"Core import: {min(float(elapsed) for elapsed, _ in runs) * 1000:.1f} ms")
+    print(f"Tkinter loaded by core import: {any(loaded == 'True' for _, loaded in runs)}")
+    setup = setup_from_args(args)
+    start = time.perf_counter()
+    simulate(setup, args.rounds, seed=args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"Simulation: {args.rounds / elapsed:.0f} rounds per second")
+    print(f"Dealer kernel: {dealer_kernel_speed(setup, args.rounds, args.seed):.0f} dealer hands per second")
+    allocations = allocation_check(setup, args.rounds, args.seed)
+    print(f"Memory allocated by a round: {allocations['mean']:.0f} bytes on average, {allocations['peak']} at most")
+    print(f"Memory left behind over {args.rounds} more rounds: {allocations['growth']} bytes in {allocations['growthBlocks']} blocks")
+    print(f"Garbage collections during those rounds: {allocations['collections']}")
+
+def dealer_kernel_speed(setup, hands, seed=None):
+    import random
+    from array import array
+    from .core import Deck
+    from .kernel import deal_order, dealer_kernel
+    random.seed(seed)
+    shoe = deal_order(Deck(setup.playerChooseNumDecks, 1))
+    starts = [random.randrange(len(shoe) - 20) for _ in range(hands)]
+    cursors = array('l', [start + 2 for start in starts])
+    start = time.perf_counter()
+    dealer_kernel([shoe[i] for i in starts], [shoe[i + 1] for i in starts], [shoe] * hands, cursors, setup.dealerStandOnSoft17)
+    return hands / (time.perf_counter() - start)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='blackjack', description="King Of Blackjack")
+    commands = parser.add_subparsers(dest='command')
+
+    play = commands.add_parser('play', help="open the GUI (the default)")
+    play.set_defaults(func=play_command)
+
+    simulate = commands.add_parser('simulate', help="simulate rounds played with basic strategy")
+    add_rule_arguments(simulate)
+    simulate.add_argument('--rounds', type=int, default=100000)
+    simulate.add_argument('--seed', type=int, default=None)
+    simulate.add_argument('--jsonl', action='store_true', help="stream running totals as JSON lines while simulating")
+    simulate.add_argument('--chunk-size', type=int, default=100000, help="rounds between JSON lines")
+    simulate.add_argument('--records', metavar='FILE', help="also stream every round as a JSON line to FILE ('-' for stdout)")
+    simulate.add_argument('--store', metavar='DIR', help="write every round to a columnar result store in DIR")
+    simulate.add_argument('--history', metavar='DB', help="add every round to the hand history in a session database")
+    simulate.add_argument('--tables', type=int, default=0, help="share the rounds over this many tables with their own seed streams")
+    simulate.add_argument('--workers', type=int, default=1, help="processes playing the tables; the result is the same for any number")
+    simulate.add_argument('--precision', type=float, default=0, metavar='PERCENT',
+                          help="play until the player edge is known to +/- this many percent, instead of a fixed number of rounds")
+    simulate.add_argument('--confidence', type=float, default=0.95, help="confidence level for --precision")
+    simulate.add_argument('--chunk-rounds', type=int, default=20000, help="rounds between precision checks")
+    simulate.add_argument('--metrics-port', type=int, default=None, metavar='PORT',
+                          help="with --tables or --precision, serve Prometheus metrics on this local port (0 picks one)")
+    simulate.add_argument('--max-rounds', type=int, default=None,
+                          help="with --precision, stop after exactly this many rounds even if the target is not met")
+    add_cache_arguments(simulate)
+    simulate.set_defaults(func=simulate_command, parser=simulate)
+
+    store = commands.add_parser('store', help="summarise rounds in a columnar result store by first action")
+    store.add_argument('path')
+    store.add_argument('--upcard', type=int, help="dealer upcard value (Ace = 11)")
+    store.add_argument('--total', type=int, help="player's starting total")
+    store.add_argument('--min-count', type=int, help="lowest true count at the deal")
+    store.add_argument('--max-count', type=int, help="highest true count at the deal")
+    store.set_defaults(func=store_command)
+
+    sidebets = commands.add_parser('sidebets', help="track exact side bet EVs card by card through simulated shoes")
+    add_shoe_arguments(sidebets)
+    sidebets.add_argument('--shoes', type=int, default=100)
+    sidebets.add_argument('--seed', type=int, default=None)
+    sidebets.set_defaults(func=sidebets_command)
+
+    insurance = commands.add_parser('insurance', help="report the insurance EV by depth into the shoe")
+    add_shoe_arguments(insurance)
+    insurance.add_argument('--shoes', type=int, default=1000)
+    insurance.add_argument('--buckets', type=int, default=10, help="number of depth buckets")
+    insurance.add_argument('--seed', type=int, default=None)
+    insurance.set_defaults(func=insurance_command)
+
+    history = commands.add_parser('history', help="summarise the hand history by first action for one starting situation")
+    history.add_argument('--path', default=None, help="session database (default: ~/.local/share/blackjack/session.db)")
+    history.add_argument('--total', type=int, help="player's starting total")
+    history.add_argument('--type', choices=('hard', 'soft', 'pair', 'unknown'),
+                         help="kind of starting hand ('unknown' for rounds saved before hand types were recorded)")
+    history.add_argument('--upcard', type=int, help="dealer upcard value (Ace = 11)")
+    history.add_argument('--min-count', type=int, help="lowest true count at the deal")
+    history.add_argument('--max-count', type=int, help="highest true count at the deal")
+    history.set_defaults(func=history_command)
+
+    audit = commands.add_parser('audit', help="price every decision of the last GUI session against the best action")
+    audit.add_argument('--path', default=None, help="session database (default: ~/.local/share/blackjack/session.db)")
+    audit.add_argument('--all', action='store_true', help="audit every saved session, not just the last one")
+    audit.add_argument('--worst', type=int, default=10, help="number of costliest mistakes to list")
+    audit.set_defaults(func=audit_command)
+
+    replay = commands.add_parser('replay', help="deal the recorded shoes again under two rule sets or policies and compare them")
+    add_rule_arguments(replay)
+    replay.add_argument('--path', default=None, help="session database (default: the GUI's)")
+    replay.add_argument('--all', action='store_true', help="replay the shoes of every session, not just the last")
+    replay.add_argument('--versus', type=parse_rule, action='append', metavar='RULE=VALUE', help="a rule B plays with instead (repeatable)")
+    replay.add_argument('--policy', choices=sorted(POLICIES), default='basic', help="how A plays its hands")
+    replay.add_argument('--versus-policy', choices=sorted(POLICIES), default='basic', help="how B plays its hands")
+    replay.add_argument('--workers', type=int, default=1)
+    replay.set_defaults(func=replay_command, parser=replay)
+
+    session = commands.add_parser('session', help="show the saved bankroll and the latest rounds played in the GUI")
+    session.add_argument('--path', default=None, help="session database (default: ~/.local/share/blackjack/session.db)")
+    session.add_argument('--recent', type=int, default=10, help="number of recent rounds to list")
+    session.set_defaults(func=session_command)
+
+    csm = commands.add_parser('csm', help="compare counting opportunities and pace between a dealt shoe and a shuffling machine")
+    add_rule_arguments(csm)
+    csm.add_argument('--rounds', type=int, default=100000)
+    csm.add_argument('--seed', type=int, default=1)
+    csm.set_defaults(func=csm_command)
+
+    whatif = commands.add_parser('whatif', help="play out every option at one decision on copies of the shoe in worker processes "
+                                 "(the real shoe column needs a dealt shoe, not --csm or --composition)")
+    add_rule_arguments(whatif)
+    whatif.add_argument('--played', type=int, default=20, help="rounds dealt from the shoe before the decision")
+    whatif.add_argument('--trials', type=int, default=20000, help="shuffles of the unseen cards played out per action")
+    whatif.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    whatif.add_argument('--seed', type=int, default=1)
+    whatif.set_defaults(func=whatif_command)
+
+    shoe = commands.add_parser('shoe', help="deal one shoe of one table of a simulate --tables run again")
+    add_rule_arguments(shoe)
+    shoe.add_argument('--seed', type=int, default=0, help="the seed of the run")
+    shoe.add_argument('--table', type=int, default=0)
+    shoe.add_argument('--shoe', type=int, default=0, help="which shoe of the table, counting from 0")
+    shoe.add_argument('--cards', type=int, default=20, help="how many of its first cards to show")
+    shoe.set_defaults(func=shoe_command)
+
+    compare = commands.add_parser('compare', help="compare two rule sets or policies played on the same shoes")
+    add_rule_arguments(compare)
+    compare.add_argument('--versus', type=parse_rule, action='append', metavar='RULE=VALUE',
+                         help="a rule B plays with instead, e.g. dealerStandOnSoft17=false (repeatable)")
+    compare.add_argument('--policy', choices=sorted(POLICIES), default='basic', help="how A plays its hands")
+    compare.add_argument('--versus-policy', choices=sorted(POLICIES), default='basic', help="how B plays its hands")
+    compare.add_argument('--rounds', type=int, default=200000, help="rounds per variant")
+    compare.add_argument('--unit-rounds', type=int, default=50, help="rounds dealt from each shared shoe sequence")
+    compare.add_argument('--antithetic', action='store_true', help="also play every unit on its mirrored shoes")
+    compare.add_argument('--seed', type=int, default=0)
+    compare.add_argument('--workers', type=int, default=1, help="processes playing the units; the result is the same for any number")
+    compare.set_defaults(func=compare_command)
+
+    tracking = commands.add_parser('tracking', help="estimate the edge a shuffle tracker gets against a non-random shuffle")
+    tracking.add_argument('--shoes', type=int, default=100000)
+    tracking.add_argument('--decks', type=int, default=6)
+    tracking.add_argument('--penetration', type=float, default=0.75)
+    tracking.add_argument('--steps', type=parse_list(str), default=['riffle', 'strip', 'riffle', 'cut'],
+                          help="the shuffle, as comma separated steps: riffle, strip and cut")
+    tracking.add_argument('--clump', type=float, default=3.0, help="mean clump size of a riffle")
+    tracking.add_argument('--strip', type=int, default=26, help="mean packet size of a strip")
+    tracking.add_argument('--no-tracker-cut', action='store_true', help="the tracker does not get to cut the slug to the front")
+    tracking.add_argument('--slug', type=int, default=52, help="cards in the slug the tracker follows")
+    tracking.add_argument('--spread', type=int, default=8, help="units bet while the slug is dealt, against one otherwise")
+    tracking.add_argument('--base-edge', type=float, default=-0.5, help="player edge in percent of a flat bettor")
+    tracking.add_argument('--seed', type=int, default=0)
+    tracking.add_argument('--workers', type=int, default=1, help="processes sharing the shoes; the result is the same for any number")
+    tracking.set_defaults(func=tracking_command)
+
+    sweep = commands.add_parser('sweep', help="estimate the house edge for every combination of rule options")
+    sweep.add_argument('--decks', type=parse_list(int), default=[1, 2, 6, 8], help="comma separated list, e.g. 1,2,6,8")
+    sweep.add_argument('--penetration', type=parse_list(float), default=[0.75])
+    sweep.add_argument('--stand-soft17', type=parse_list(parse_flag), default=[True, False])
+    sweep.add_argument('--surrender', type=parse_list(parse_flag), default=[True])
+    sweep.add_argument('--insurance', type=parse_list(parse_flag), default=[True])
+    sweep.add_argument('--payout', type=parse_list(parse_odds), default=[1.5])
+    sweep.add_argument('--csm', type=parse_list(parse_flag), default=[False])
+    sweep.add_argument('--rounds', type=int, default=1000000, help="rounds per configuration")
+    sweep.add_argument('--seed', type=int, default=1)
+    sweep.add_argument('--workers', type=int, default=None, help="worker processes (default: one per core)")
+    sweep.add_argument('--output', default='sweep.jsonl', help="finished configurations are appended here and skipped on restart")
+    sweep.set_defaults(func=sweep_command)
+
+    solve = commands.add_parser('solve', help="compute the best strategy for a set of rules")
+    add_rule_arguments(solve)
+    solve.add_argument('--hand', nargs='+', metavar='RANK', help="solve a single hand, e.g. --hand 10 6 --upcard 10")
+    solve.add_argument('--upcard', default='10', metavar='RANK')
+    solve.add_argument('--workers', type=int, default=0, help="solve the table on this many processes, a row at a time")
+    add_cache_arguments(solve)
+    solve.set_defaults(func=solve_command)
+
+    bench = commands.add_parser('bench', help="measure startup time and simulation speed")
+    add_rule_arguments(bench)
+    bench.add_argument('--rounds', type=int, default=20000)
+    bench.add_argument('--seed', type=int, default=1)
+    bench.add_argument('--repeat', type=int, default=5)
+    bench.set_defaults(func=bench_command)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        args.func = play_command
+    args.func(args)
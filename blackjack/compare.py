@@ -0,0 +1,82 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+from .core import Deck
+from .seeds import derive_seed
+from .simulation import RoundPool, new_deck, play_round
+from .stats import RunningStats
+from .strategy import basic_strategy
+
+# A mirrored shoe swaps every rank for the one at the other end of the ranks: 2 with Ace, 3 with King and so on,
+# with 8 left as it is. Every rank keeps its number of cards, so the mirror of a shuffle is just as likely.
+MIRROR_CODES = [4 * (len(Deck.ranks) - 1 - code // 4) + code % 4 for code in range(len(Deck.codeCards))]
+
+class MirroredDeck(Deck):
+    # The antithetic twin of a seeded Deck: the same shuffles with the ranks mirrored, so a shoe rich in tens and
+    # Aces becomes one rich in small cards and the two results tend to fall on opposite sides of the mean
+    def shuffle_deck(self):
+        super().shuffle_deck()
+        codes = self.cardCodes
+        self.cards[:] = [self.codeCards[MIRROR_CODES[codes[card]]] for card in self.cards]
+        self.count_cards()
+
+def unit_edge(setup, policy, rounds, seed, mirrored=False):
+    if mirrored:
+        deck = MirroredDeck(setup.playerChooseNumDecks, setup.deckPenetration, seed=seed)
+    else:
+        deck = new_deck(setup, seed)
+    pool = RoundPool()
+    net = 0
+    for _ in range(rounds):
+        net += play_round(setup, deck, policy, pool=pool).net
+    return net / rounds
+
+def play_units(variants, unitRounds, seed, units, antithetic):
+    # Both variants play every unit on the same seeded shoes; with antithetic each also plays the mirrored shoes.
+    # Returns, for each unit, each variant's edge on the plain shoes and its edge averaged with the mirror.
+    rows = []
+    for unit in units:
+        unitSeed = derive_seed(seed, 'unit', unit)
+        row = []
+        for setup, policy in variants:
+            plain = unit_edge(setup, policy, unitRounds, unitSeed)
+            row.append((plain, (plain + unit_edge(setup, policy, unitRounds, unitSeed, True)) / 2 if antithetic else plain))
+        rows.append(row)
+    return rows
+
+def compare(setupA, setupB, rounds, seed=0, policyA=basic_strategy, policyB=basic_strategy, unitRounds=50, antithetic=False, workers=1):
+    # The edge of A minus the edge of B, both played on common random numbers: the rounds come in units of
+    # unitRounds dealt from a fresh shoe seeded for that unit, which both variants play. A difference between
+    # them then only has to stand out against the noise the shoes cause them differently, and the confidence
+    # interval comes from the spread of the paired unit differences. Each variant plays about rounds rounds.
+    if antithetic and any(setup.autoReshuffle or setup.compositionShoe or setup.infiniteDeck for setup in (setupA, setupB)):
+        raise ValueError("Antithetic shoes need a dealt shoe of real cards")
+    variants = ((setupA, policyA), (setupB, policyB))
+    units = max(2, rounds // (unitRounds * (2 if antithetic else 1)))
+    if workers == 1:
+        rows = play_units(variants, unitRounds, seed, range(units), antithetic)
+    else:
+        blocks = [range(start, min(units, start + 64)) for start in range(0, units, 64)]
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [pool.submit(play_units, variants, unitRounds, seed, block, antithetic) for block in blocks]
+            rows = [row for future in futures for row in future.result()]  # Unit order, whatever finished first
+    plainA, plainB, edgeA, edgeB, difference = (RunningStats() for _ in range(5))
+    for (a, pairedA), (b, pairedB) in rows:
+        plainA.add(a)
+        plainB.add(b)
+        edgeA.add(pairedA)
+        edgeB.add(pairedB)
+        difference.add(pairedA - pairedB)
+    # What two separate runs of the same size would give: plain units, twice as many of them with antithetic shoes
+    independentUnits = units * (2 if antithetic else 1)
+    independentStderr = math.sqrt((plainA.variance + plainB.variance) / independentUnits)
+    return {
+        'rounds': independentUnits * unitRounds,
+        'units': units,
+        'edge_a': edgeA.mean,
+        'edge_b': edgeB.mean,
+        'difference': difference.mean,
+        'stderr': difference.stderr,
+        'independent_stderr': independentStderr,
+        'rounds_saved': (independentStderr / difference.stderr) ** 2 if difference.stderr else math.inf,
+    }
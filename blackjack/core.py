@@ -0,0 +1,422 @@
+import itertools
+import random
+from array import array
+from collections import deque, namedtuple
+
+from .csm import ContinuousShuffler, FenwickTree
+from .seeds import derive_seed
+from .sidebets import PAYTABLES, lucky_ladies_result, perfect_pairs_result, twenty_one_three_result
+
+Card = namedtuple('Card', ['rank', 'suit'])
+
+class Deck:
+    ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
+    suits = ['Clubs', 'Diamonds', 'Hearts', 'Spades']
+    values = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7, '8': 8, '9': 9, '10': 10, 'Jack': 10, 'Queen': 10, 'King': 10, 'Ace': 11}
+    countValues = {'2': 1, '3': 1, '4': 1, '5': 1, '6': 1, '7': 0, '8': 0, '9': 0, '10': -1, 'Jack': -1, 'Queen': -1, 'King': -1, 'Ace': -1}  # Hi-Lo
+    rankIndex = {rank: index for index, rank in enumerate(ranks)}
+    codeCards = [Card(rank, suit) for rank, suit in itertools.product(ranks, suits)]  # Code rank * 4 + suit -> Card
+    cardCodes = {card: code for code, card in enumerate(codeCards)}
+
+    def __init__(self, playerChooseNumDecks=1, deckPenetration=0.75, verbose=False, logDiscards=False, seed=None):
+        self.seed = seed  # With a seed, shuffle n is dealt from its own stream, derive_seed(seed, 'shuffle', n)
+        self.rng = random if seed is None else random.Random()
+        self.playerChooseNumDecks = playerChooseNumDecks
+        self.deckPenetration = deckPenetration
+        self.verbose = verbose
+        self.on_reshuffle = None  # Set by the GUI to tell the player about penetration reshuffles
+        self.observers = []  # Objects with card_drawn(card) and deck_shuffled(deck) that track the shoe composition
+        self.discardCounts = [0] * len(self.ranks)  # Cards of each rank played since the last shuffle
+        self.discardLog = array('B') if logDiscards else None  # Their codes in the order they were played, when wanted
+        self.csm = None  # A ContinuousShuffler while the deck is played from a continuous shuffling machine
+        self.shuffles = 0
+        self.cards = []
+        self.fullDeck = []
+        self.shuffle_deck()
+
+    def shuffle_deck(self):
+        if len(self.fullDeck) != 52 * self.playerChooseNumDecks:
+            self.fullDeck = self.codeCards * self.playerChooseNumDecks
+        self.cards[:] = self.fullDeck  # Refill the same list from the same Cards instead of building new ones
+        self.clear_discards()  # Everything is back in the shoe
+        self.start_stream()
+        self.rng.shuffle(self.cards)
+        self.shuffles += 1
+        self.count_cards()
+        for observer in self.observers:
+            observer.deck_shuffled(self)
+        if self.verbose:
+            print(f"Deck shuffled. Total cards: {len(self.cards)}")  # Debug print
+
+    def start_stream(self):
+        if self.seed is not None:
+            self.rng.seed(derive_seed(self.seed, 'shuffle', self.shuffles))
+
+    def deal_shoe(self, shoe):
+        # Shuffles the shoe a seeded deck deals as its shoe-th, without dealing the ones before it
+        self.shuffles = shoe
+        self.shuffle_deck()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if state['rng'] is random:
+            state['rng'] = None  # The global generator is saved separately by whoever seeded it
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.rng is None:
+            self.rng = random
+
+    def draw_card(self):
+        if self.csm:
+            card = self.csm.draw()
+        else:
+            penetration_limit = int((self.playerChooseNumDecks * 52) * (1 - self.deckPenetration))
+            if self.verbose:
+                print(f"Cards left: {len(self.cards)}, Penetration limit: {penetration_limit}")  # Debug print
+            if len(self.cards) <= penetration_limit:
+                self.shuffle_deck()
+                if self.on_reshuffle:
+                    self.on_reshuffle()
+            card = self.cards.pop() if self.cards else None
+        if not card:
+            return None
+        self.runningCount += self.countValues[card.rank]
+        self.cardsRemaining -= 1
+        if self.values[card.rank] == 10:
+            self.tensRemaining -= 1
+        for observer in self.observers:
+            observer.card_drawn(card)
+        return card
+
+    def remaining_cards(self):
+        return self.csm.cards() if self.csm else self.cards
+
+    def count_cards(self):
+        self.runningCount = 0
+        self.cardsRemaining = 0
+        self.tensRemaining = 0
+        for card in self.remaining_cards():
+            self.cardsRemaining += 1
+            self.tensRemaining += self.values[card.rank] == 10
+
+    def insurance_ev(self, hiddenCard=None):
+        # The dealer's hole card has already left the shoe but is still unseen, so it counts as part of the shoe
+        tens = self.tensRemaining
+        cards = self.cardsRemaining
+        if hiddenCard:
+            tens += self.values[hiddenCard.rank] == 10
+            cards += 1
+        return SideBets.insurance_ev(tens, cards)
+
+    def true_count(self):
+        decksLeft = self.cardsRemaining / 52
+        return self.runningCount / decksLeft if decksLeft else 0
+
+    def save_deck(self, filename):
+        import pickle  # Only needed here and in load_deck, so importing the core does not pay for it
+        with open(filename, 'wb') as f:
+            pickle.dump(list(self.remaining_cards()), f)
+
+    def load_deck(self, filename):
+        import pickle
+        with open(filename, 'rb') as f:
+            self.load_cards(pickle.load(f))
+
+    def load_cards(self, cards):
+        self.cards = cards
+        self.csm = None  # A saved shoe is dealt from the top, so the machine's own order is not kept
+        self.count_cards()
+        for observer in self.observers:
+            observer.deck_shuffled(self)
+
+    def add_to_discard_pile(self, cards):
+        counts = self.discardCounts
+        rankIndex = self.rankIndex
+        for card in cards:
+            counts[rankIndex[card.rank]] += 1
+        if self.discardLog is not None:
+            self.discardLog.extend(map(self.cardCodes.__getitem__, cards))
+
+    def clear_discards(self):
+        counts = self.discardCounts
+        for rank in range(len(counts)):
+            counts[rank] = 0
+        if self.discardLog is not None:
+            del self.discardLog[:]
+
+    def return_discard_pile_to_deck(self):
+        if self.csm:
+            self.csm.insert(map(self.codeCards.__getitem__, self.discardLog))
+            self.clear_discards()
+            return
+        self.shuffle_deck()  # A full shoe is rebuilt anyway, so the played cards need not be put back one by one
+
+    def start_csm(self, shelves=38, shelfSize=0, bufferSize=10):
+        if self.discardLog is None:
+            self.discardLog = array('B')  # The machine puts back the actual cards, in the order they were played
+        self.csm = None
+        self.shuffle_deck()
+        self.csm = ContinuousShuffler(self.cards, shelves, shelfSize, bufferSize, placed=self.csm_placed, rng=self.rng)
+        self.cards = []
+        self.count_cards()
+
+    def stop_csm(self):
+        self.csm = None
+        self.shuffle_deck()
+
+    def csm_placed(self, cards):
+        # Cards back in the machine are unseen again, so they come off the running count and back into the totals
+        for card in cards:
+            self.runningCount -= self.countValues[card.rank]
+            self.cardsRemaining += 1
+            self.tensRemaining += self.values[card.rank] == 10
+        for observer in self.observers:
+            observer.deck_shuffled(self)
+
+    def ranks_placed(self, counts):
+        for rank, count in zip(self.ranks, counts):
+            self.runningCount -= self.countValues[rank] * count
+            self.cardsRemaining += count
+            if self.values[rank] == 10:
+                self.tensRemaining += count
+        for observer in self.observers:
+            observer.deck_shuffled(self)
+
+class CompositionDeck(Deck):
+    # Keeps only how many cards of each rank are left and draws a rank with probability proportional to its
+    # count, so a shoe of any size takes the same memory. Suits are dealt at random, which keeps the main game
+    # exact but makes suit dependent side bets approximate. With infinite=True cards are never used up.
+    def __init__(self, playerChooseNumDecks=1, deckPenetration=0.75, verbose=False, infinite=False, logDiscards=False, seed=None):
+        self.infinite = infinite
+        self.continuous = False
+        self.buffer = deque()  # Codes of returned cards waiting to go back into the counts
+        self.bufferSize = 0
+        super().__init__(playerChooseNumDecks, deckPenetration, verbose, logDiscards, seed)
+
+    def shuffle_deck(self):
+        self.counts = [4 * (1 if self.infinite else self.playerChooseNumDecks)] * len(self.ranks)
+        self.tree = FenwickTree(self.counts)
+        self.buffer.clear()
+        self.clear_discards()
+        self.start_stream()
+        self.shuffles += 1
+        self.count_cards()
+        for observer in self.observers:
+            observer.deck_shuffled(self)
+        if self.verbose:
+            print(f"Deck shuffled. Total cards: {self.cardsRemaining}")  # Debug print
+
+    def draw_card(self):
+        if not (self.infinite or self.continuous):
+            penetration_limit = int((self.playerChooseNumDecks * 52) * (1 - self.deckPenetration))
+            if self.cardsRemaining <= penetration_limit:
+                self.shuffle_deck()
+                if self.on_reshuffle:
+                    self.on_reshuffle()
+        if not self.tree.total:
+            return None
+        rank = self.tree.find(self.rng.randrange(self.tree.total))
+        card = self.codeCards[4 * rank + self.rng.randrange(4)]
+        if self.infinite:
+            return card  # Every draw leaves the composition, and so the count, where it was
+        self.counts[rank] -= 1
+        self.tree.add(rank, -1)
+        self.runningCount += self.countValues[card.rank]
+        self.cardsRemaining -= 1
+        if self.values[card.rank] == 10:
+            self.tensRemaining -= 1
+        for observer in self.observers:
+            observer.card_drawn(card)
+        return card
+
+    def remaining_cards(self):
+        for rank, count in zip(self.ranks, self.counts):
+            for index in range(count):
+                yield Card(rank, self.suits[index % 4])
+
+    def count_cards(self):
+        self.runningCount = 0
+        self.cardsRemaining = sum(self.counts)
+        self.tensRemaining = sum(count for rank, count in zip(self.ranks, self.counts) if self.values[rank] == 10)
+
+    def load_cards(self, cards):
+        self.counts = [0] * len(self.ranks)
+        for card in cards:
+            self.counts[self.rankIndex[card.rank]] += 1
+        self.tree = FenwickTree(self.counts)
+        self.count_cards()
+        for observer in self.observers:
+            observer.deck_shuffled(self)
+
+    def return_discard_pile_to_deck(self):
+        if not self.continuous:
+            self.shuffle_deck()
+            return
+        # Any order is as likely as any other, so a card coming back only has to be counted into its rank
+        if self.bufferSize:
+            self.buffer.extend(self.discardLog)
+            placed = [0] * len(self.ranks)
+            while len(self.buffer) > self.bufferSize:
+                placed[self.buffer.popleft() >> 2] += 1
+        else:
+            placed = self.discardCounts
+        for rank, count in enumerate(placed):
+            self.counts[rank] += count
+        self.tree = FenwickTree(self.counts)
+        if any(placed):
+            self.ranks_placed(placed)
+        self.clear_discards()
+
+    def start_csm(self, shelves=38, shelfSize=0, bufferSize=10):
+        # Shelves only decide the order cards come back in, which a composition shoe does not keep
+        if bufferSize and self.discardLog is None:
+            self.discardLog = array('B')  # The delay buffer lets cards back in the order they were played
+        self.continuous = True
+        self.bufferSize = bufferSize
+        self.shuffle_deck()
+
+    def stop_csm(self):
+        self.continuous = False
+        self.shuffle_deck()
+
+class Hand:
+    __slots__ = ('hand', 'total', 'aces')  # total counts every Ace as 11, get_value takes 10 off for each Ace it needs to
+
+    def __init__(self):
+        self.hand = []
+        self.total = 0
+        self.aces = 0
+
+    def add_card(self, card):
+        if card:
+            self.hand.append(card)
+            self.total += Deck.values[card.rank]
+            self.aces += card.rank == 'Ace'
+
+    def pop_card(self):
+        card = self.hand.pop()
+        self.total -= Deck.values[card.rank]
+        self.aces -= card.rank == 'Ace'
+        return card
+
+    def get_value(self):
+        value = self.total
+        numAces = self.aces
+        while value > 21 and numAces:
+            value -= 10
+            numAces -= 1
+        return value
+
+    def is_soft(self):
+        value = self.total
+        numAces = self.aces
+        while value > 21 and numAces:
+            value -= 10
+            numAces -= 1
+        return numAces > 0
+
+    def is_blackjack(self):
+        return len(self.hand) == 2 and self.get_value() == 21
+
+    def can_split(self):
+        return len(self.hand) == 2 and Deck.values[self.hand[0].rank] == Deck.values[self.hand[1].rank]
+
+    def clear(self):
+        self.hand.clear()  # Keeps the list and its capacity for the next round
+        self.total = 0
+        self.aces = 0
+
+    def discard(self, deck):
+        deck.add_to_discard_pile(self.hand)  # The deck only counts the cards, so it is given the list itself
+        self.clear()
+
+    def __str__(self):
+        return ' , '.join(f"{card.rank} of {card.suit}" for card in self.hand) + f" ({self.get_value()})"
+
+class HandPool:
+    # Hands handed back after a round are cleared and given out again, so a long run stops creating Hand objects
+    __slots__ = ('free',)
+
+    def __init__(self):
+        self.free = []
+
+    def acquire(self):
+        return self.free.pop() if self.free else Hand()
+
+    def release(self, hand):
+        hand.clear()
+        self.free.append(hand)
+
+class SideBets:
+    def __init__(self, paytables=None):
+        self.insurance = False
+        self.insurance_amount = 0
+        self.paytables = {**PAYTABLES, **(paytables or {})}
+        self.wagers = {}  # Side bet name ('perfect_pairs', 'twenty_one_three' or 'lucky_ladies') -> amount
+
+    def place(self, name, amount):
+        self.wagers[name] = amount
+
+    def settle(self, playerCards, upcard, dealerBlackjack):
+        # Returns the winning category and the amount paid back (stake included, 0 for a loss) for each side bet
+        results = {}
+        for name, amount in self.wagers.items():
+            if name == 'perfect_pairs':
+                category = perfect_pairs_result(playerCards)
+            elif name == 'twenty_one_three':
+                category = twenty_one_three_result(playerCards[:2] + [upcard])
+            else:
+                category = lucky_ladies_result(playerCards, dealerBlackjack)
+            results[name] = (category, amount * (self.paytables[name][category] + 1) if category else 0)
+        return results
+
+    def buy_insurance(self, bet, bankroll):
+        insurance_cost = bet / 2
+        if bankroll >= insurance_cost:
+            self.insurance = True
+            self.insurance_amount = insurance_cost
+            return insurance_cost, True
+        else:
+            return 0, False
+
+    @staticmethod
+    def insurance_ev(tens, cards):
+        # Insurance pays 2:1 when the hole card is a ten, so per unit staked it is worth 3 * tens / cards - 1
+        return 3 * tens / cards - 1 if cards else -1
+
+    def clear(self):
+        self.insurance = False
+        self.insurance_amount = 0
+        self.wagers = {}
+
+class GameSetup:
+    def __init__(self):
+        self.playerChooseNumDecks = 1
+        self.deckPenetration = 0.75  # Default penetration level set to 75%
+        self.playWithInsurance = True
+        self.playWithSurrender = True
+        self.dealerStandOnSoft17 = True
+        self.initialBankroll = 1000
+        self.payoutOdds = 1.5
+        self.loadFile = None
+        self.autoReshuffle = False
+        self.csmShelves = 38  # Continuous shuffling machine used when autoReshuffle is on
+        self.csmShelfSize = 0  # 0 sizes the shelves to fit the shoe
+        self.csmBufferSize = 10  # Discards held back before they are shuffled in
+        self.compositionShoe = False  # Track rank counts instead of dealing real cards
+        self.infiniteDeck = False  # Draw every card from a full deck, a composition shoe that never runs down
+
+    ruleNames = ('playerChooseNumDecks', 'deckPenetration', 'playWithInsurance', 'playWithSurrender', 'dealerStandOnSoft17', 'payoutOdds', 'autoReshuffle',
+                 'csmShelves', 'csmShelfSize', 'csmBufferSize', 'compositionShoe', 'infiniteDeck')
+
+    def rules(self):
+        return {name: getattr(self, name) for name in self.ruleNames}
+
+    @classmethod
+    def from_rules(cls, rules):
+        setup = cls()
+        for name, value in rules.items():
+            setattr(setup, name, value)
+        return setup
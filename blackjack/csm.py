@@ -0,0 +1,106 @@
+import random
+from collections import deque
+
+class FenwickTree:
+    def __init__(self, values):
+        self.size = len(values)
+        self.tree = [0] * (self.size + 1)
+        self.total = 0
+        for index, value in enumerate(values):
+            self.add(index, value)
+
+    def add(self, index, delta):
+        self.total += delta
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def find(self, target):
+        # Index of the slot holding the target-th unit (0-based), found in O(log n) by walking down the tree
+        index = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            following = index + step
+            if following <= self.size and self.tree[following] <= target:
+                index = following
+                target -= self.tree[following]
+            step >>= 1
+        return index
+
+class ContinuousShuffler:
+    # A carousel of shelves. Returned cards wait in a delay buffer, then each one drops into a random free
+    # slot (so fuller shelves are less likely to get it) at a random height in that shelf. When the dealing
+    # tray runs out the machine unloads a random loaded shelf into it. Fenwick trees over the free slots and
+    # the loaded shelves make picking a shelf O(log shelves) however many decks are loaded.
+    def __init__(self, cards, shelves=38, shelfSize=0, bufferSize=10, placed=None, rng=random):
+        self.rng = rng
+        self.shelfSize = shelfSize or -(-len(cards) * 5 // (shelves * 4))  # Room for a quarter more cards than the shoe holds
+        if self.shelfSize * shelves < len(cards):
+            raise ValueError("The shelves cannot hold every card in the shoe")
+        self.bufferSize = bufferSize
+        self.placed = placed
+        self.shelves = [[] for _ in range(shelves)]
+        self.free = FenwickTree([self.shelfSize] * shelves)
+        self.loaded = FenwickTree([0] * shelves)
+        self.tray = []
+        self.buffer = deque()
+        self.count = 0
+        for card in cards:
+            self.place(card)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if state['rng'] is random:
+            state['rng'] = None  # Modules cannot be pickled, and the global generator is saved by whoever seeded it
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.rng is None:
+            self.rng = random
+
+    def __len__(self):
+        return self.count
+
+    def cards(self):
+        yield from self.tray
+        for shelf in self.shelves:
+            yield from shelf
+
+    def place(self, card):
+        shelf = self.free.find(self.rng.randrange(self.free.total))
+        cards = self.shelves[shelf]
+        if not cards:
+            self.loaded.add(shelf, 1)
+        cards.insert(self.rng.randrange(len(cards) + 1), card)
+        self.free.add(shelf, -1)
+        self.count += 1
+
+    def insert(self, cards):
+        self.buffer.extend(cards)
+        self.release(len(self.buffer) - self.bufferSize)
+
+    def release(self, number):
+        placed = []
+        for _ in range(number):
+            card = self.buffer.popleft()
+            self.place(card)
+            placed.append(card)
+        if placed and self.placed:
+            self.placed(placed)
+
+    def draw(self):
+        if not self.tray:
+            if not self.loaded.total:
+                self.release(len(self.buffer))
+                if not self.loaded.total:
+                    return None
+            shelf = self.loaded.find(self.rng.randrange(self.loaded.total))
+            self.tray = self.shelves[shelf]
+            self.tray.reverse()  # Dealt from the bottom of the shelf up
+            self.shelves[shelf] = []
+            self.loaded.add(shelf, -1)
+            self.free.add(shelf, len(self.tray))
+        self.count -= 1
+        return self.tray.pop()
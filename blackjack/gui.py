@@ -0,0 +1,511 @@
+import tkinter as tk
+from tkinter import messagebox, ttk
+import copy
+
+from .core import Deck, Hand, SideBets, GameSetup
+from .session import SessionStore, ShoeRecorder
+from .sidebets import SIDE_BET_NAMES, SideBetOdds
+from .simulation import hand_options, hand_type, simulate_rounds
+from .solver import card_value
+from .workers import WorkerPool
+
+class KingOfBlackjack:
+    def __init__(self, setup, deck, root, store=None, initial_bankroll=None):
+        self.setup = setup
+        self.deck = deck
+        self.root = root
+        self.store = store  # SessionStore that keeps the settings, bankroll and round history between sessions
+        self.initial_bankroll = setup.initialBankroll if initial_bankroll is None else initial_bankroll  # Store the initial bankroll
+        self.deck.on_reshuffle = self.deck_reshuffled
+        self.side_bets = SideBets()
+        self.side_bet_odds = SideBetOdds(self.deck, self.side_bets.paytables)
+        if store:
+            ShoeRecorder(store, self.deck)
+        self.workers = WorkerPool(root)
+        self.simulation_job = None
+        self.style = ttk.Style()
+        self.style.configure('TButton', font=('Helvetica', 12))
+        self.style.configure('TLabel', font=('Helvetica', 12))
+        self.style.configure('TEntry', font=('Helvetica', 12))
+        self.create_main_menu()
+
+    def close(self):
+        # Stops a running simulation and the worker threads before the window goes
+        if self.simulation_job:
+            self.simulation_job.cancel()
+        self.workers.shutdown()
+
+    def create_main_menu(self):
+        self.clear_window()
+
+        self.root.title("King Of Blackjack - Main Menu")
+
+        main_frame = ttk.Frame(self.root, padding="20 20 20 20")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+
+        play_button = ttk.Button(main_frame, text="Play King Of Blackjack", command=self.create_game_screen)
+        play_button.pack(pady=10)
+
+        settings_button = ttk.Button(main_frame, text="Settings", command=self.create_settings_screen)
+        settings_button.pack(pady=10)
+
+        simulation_button = ttk.Button(main_frame, text="Run Simulation", command=self.create_simulation_screen)
+        simulation_button.pack(pady=10)
+
+        exit_button = ttk.Button(main_frame, text="Exit", command=self.root.quit)
+        exit_button.pack(pady=10)
+
+    def create_game_screen(self):
+        self.clear_window()
+
+        self.root.title("King Of Blackjack")
+
+        game_frame = ttk.Frame(self.root, padding="20 20 20 20")
+        game_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.bankroll_label = ttk.Label(game_frame, text=f"Bankroll: {self.setup.initialBankroll}")
+        self.bankroll_label.pack(pady=10)
+
+        self.bet_label = ttk.Label(game_frame, text="Enter your bet amount:")
+        self.bet_label.pack()
+        
+        self.bet_entry = ttk.Entry(game_frame)
+        self.bet_entry.pack()
+
+        side_bet_frame = ttk.Frame(game_frame)
+        side_bet_frame.pack(pady=5)
+        self.side_bet_entries = {}
+        for column, (name, label) in enumerate(SIDE_BET_NAMES.items()):
+            ttk.Label(side_bet_frame, text=f"{label} bet:").grid(row=0, column=column, padx=5)
+            entry = ttk.Entry(side_bet_frame, width=8)
+            entry.grid(row=1, column=column, padx=5)
+            self.side_bet_entries[name] = entry
+
+        evs = self.side_bet_odds.evs()
+        self.side_bet_ev_label = ttk.Label(game_frame, text="Side bet EV for this shoe: " + ", ".join(f"{SIDE_BET_NAMES[name]} {ev * 100:+.2f}%" for name, ev in evs.items()))
+        self.side_bet_ev_label.pack()
+
+        self.start_button = ttk.Button(game_frame, text="Start Game", command=self.start_game)
+        self.start_button.pack(pady=10)
+
+        self.player_hand_label = ttk.Label(game_frame, text="Player's Hand:")
+        self.player_hand_label.pack(pady=10)
+
+        self.dealer_hand_label = ttk.Label(game_frame, text="Dealer's Hand:")
+        self.dealer_hand_label.pack(pady=10)
+
+        button_frame = ttk.Frame(game_frame)
+        button_frame.pack(pady=10)
+
+        self.hit_button = ttk.Button(button_frame, text="Hit", command=self.hit)
+        self.hit_button.pack(pady=5, side=tk.LEFT)
+
+        self.stand_button = ttk.Button(button_frame, text="Stand", command=self.stand)
+        self.stand_button.pack(pady=5, side=tk.LEFT)
+
+        self.double_button = ttk.Button(button_frame, text="Double Down", command=self.double_down)
+        self.double_button.pack(pady=5, side=tk.LEFT)
+
+        self.surrender_button = ttk.Button(button_frame, text="Surrender", command=self.surrender)
+        self.surrender_button.pack(pady=5, side=tk.LEFT)
+
+        self.split_button = ttk.Button(button_frame, text="Split", command=self.split)
+        self.split_button.pack(pady=5, side=tk.LEFT)
+
+        self.main_menu_button = ttk.Button(game_frame, text="Main Menu", command=self.create_main_menu)
+        self.main_menu_button.pack(pady=10)
+
+        self.reset_bankroll_button = ttk.Button(game_frame, text="Reset Bankroll", command=self.reset_bankroll)
+        self.reset_bankroll_button.pack(pady=10, side=tk.LEFT)
+
+        self.return_discard_pile_button = ttk.Button(game_frame, text="Return Discards to Deck", command=self.return_discard_pile_to_deck)
+        self.return_discard_pile_button.pack(pady=10, side=tk.LEFT)
+
+    def create_settings_screen(self):
+        self.clear_window()
+
+        settings_frame = ttk.Frame(self.root, padding="20 20 20 20")
+        settings_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.root.title("King Of Blackjack - Settings")
+
+        self.back_button = ttk.Button(settings_frame, text="Back to Main Menu", command=self.create_main_menu)
+        self.back_button.pack(pady=10)
+
+        self.decks_label = ttk.Label(settings_frame, text="Number of Decks:")
+        self.decks_label.pack()
+        self.decks_entry = ttk.Entry(settings_frame)
+        self.decks_entry.pack()
+        self.decks_entry.insert(0, str(self.setup.playerChooseNumDecks))
+
+        self.penetration_label = ttk.Label(settings_frame, text="Deck Penetration:")
+        self.penetration_label.pack()
+        self.penetration_entry = ttk.Entry(settings_frame)
+        self.penetration_entry.pack()
+        self.penetration_entry.insert(0, str(self.setup.deckPenetration))
+
+        self.bankroll_label = ttk.Label(settings_frame, text="Initial Bankroll:")
+        self.bankroll_label.pack()
+        self.bankroll_entry = ttk.Entry(settings_frame)
+        self.bankroll_entry.pack()
+        self.bankroll_entry.insert(0, str(self.setup.initialBankroll))
+
+        self.odds_label = ttk.Label(settings_frame, text="Blackjack Payout Odds (2:1, 3:2), 6:5:")
+        self.odds_label.pack()
+        self.odds_entry = ttk.Entry(settings_frame)
+        self.odds_entry.pack()
+        self.odds_entry.insert(0, f"{int(self.setup.payoutOdds * 2)}:2")
+
+        self.insurance_var = tk.BooleanVar(value=self.setup.playWithInsurance)
+        self.surrender_var = tk.BooleanVar(value=self.setup.playWithSurrender)
+        self.soft17_var = tk.BooleanVar(value=self.setup.dealerStandOnSoft17)
+        self.auto_reshuffle_var = tk.BooleanVar(value=self.setup.autoReshuffle)
+
+        self.insurance_check = ttk.Checkbutton(settings_frame, text="Play with Insurance? (2:1 Odds)", variable=self.insurance_var)
+        self.insurance_check.pack(pady=5)
+
+        self.surrender_check = ttk.Checkbutton(settings_frame, text="Play with Surrender? (Fold your hand and lose half of your bet)", variable=self.surrender_var)
+        self.surrender_check.pack(pady=5)
+
+        self.soft17_check = ttk.Checkbutton(settings_frame, text="Dealer Stands on Soft 17?", variable=self.soft17_var)
+        self.soft17_check.pack(pady=5)
+
+        self.auto_reshuffle_check = ttk.Checkbutton(settings_frame, text="Auto Reshuffle After Each Round (Utilize a CSM)", variable=self.auto_reshuffle_var)
+        self.auto_reshuffle_check.pack(pady=5)
+
+        self.save_button = ttk.Button(settings_frame, text="Save Settings", command=self.save_settings)
+        self.save_button.pack(pady=10)
+
+    def save_settings(self):
+        try:
+            self.setup.playerChooseNumDecks = int(self.decks_entry.get())
+            self.setup.deckPenetration = float(self.penetration_entry.get())
+            self.setup.initialBankroll = float(self.bankroll_entry.get())
+            self.initial_bankroll = self.setup.initialBankroll  # Update the initial bankroll for reset functionality
+            odds = self.odds_entry.get().split(':')
+            self.setup.payoutOdds = float(odds[0]) / float(odds[1])
+            self.setup.playWithInsurance = self.insurance_var.get()
+            self.setup.playWithSurrender = self.surrender_var.get()
+            self.setup.dealerStandOnSoft17 = self.soft17_var.get()
+            self.setup.autoReshuffle = self.auto_reshuffle_var.get()
+            if self.store:
+                self.store.save_settings({**self.setup.rules(), 'initialBankroll': self.initial_bankroll, 'bankroll': self.setup.initialBankroll})
+            messagebox.showinfo("Settings Saved", "Settings have been saved successfully.")
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Please enter valid settings.")
+
+    def create_simulation_screen(self):
+        self.clear_window()
+
+        self.root.title("King Of Blackjack - Simulation")
+
+        simulation_frame = ttk.Frame(self.root, padding="20 20 20 20")
+        simulation_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.back_button = ttk.Button(simulation_frame, text="Back to Main Menu", command=self.leave_simulation_screen)
+        self.back_button.pack(pady=10)
+
+        self.rounds_label = ttk.Label(simulation_frame, text="Number of Rounds (played with basic strategy and the current settings):")
+        self.rounds_label.pack()
+        self.rounds_entry = ttk.Entry(simulation_frame)
+        self.rounds_entry.pack()
+        self.rounds_entry.insert(0, "100000")
+
+        self.start_simulation_button = ttk.Button(simulation_frame, text="Start Simulation", command=self.start_simulation)
+        self.start_simulation_button.pack(pady=10)
+
+        self.simulation_progress = ttk.Progressbar(simulation_frame, length=300, maximum=1.0)
+        self.simulation_progress.pack(pady=5)
+
+        self.simulation_status_label = ttk.Label(simulation_frame, text="")
+        self.simulation_status_label.pack(pady=5)
+
+        self.cancel_simulation_button = ttk.Button(simulation_frame, text="Cancel Simulation", command=self.cancel_simulation, state=tk.DISABLED)
+        self.cancel_simulation_button.pack(pady=10)
+
+    def start_simulation(self):
+        try:
+            rounds = int(self.rounds_entry.get())
+            if rounds <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Please enter a valid number of rounds.")
+            return
+        self.simulation_job = self.workers.submit(simulate_rounds, copy.copy(self.setup), rounds,
+                                                  on_done=self.simulation_finished, on_progress=self.simulation_progressed,
+                                                  on_error=self.simulation_failed, on_cancel=self.simulation_cancelled)
+        self.start_simulation_button.config(state=tk.DISABLED)
+        self.cancel_simulation_button.config(state=tk.NORMAL)
+        self.simulation_progress.config(value=0)
+        self.simulation_status_label.config(text=f"Simulating {rounds} rounds...")
+
+    def simulation_progressed(self, fraction):
+        if self.simulation_job and not self.simulation_job.cancelled:
+            self.simulation_progress.config(value=fraction)
+
+    def simulation_finished(self, result):
+        if self.simulation_job is None:
+            return
+        self.simulation_job = None
+        self.simulation_progress.config(value=1.0)
+        self.start_simulation_button.config(state=tk.NORMAL)
+        self.cancel_simulation_button.config(state=tk.DISABLED)
+        self.simulation_status_label.config(text=self.format_simulation_result(result))
+
+    def simulation_cancelled(self, result):
+        if self.simulation_job is None:
+            return  # The player already left the simulation screen
+        self.simulation_job = None
+        self.start_simulation_button.config(state=tk.NORMAL)
+        self.cancel_simulation_button.config(state=tk.DISABLED)
+        self.simulation_status_label.config(text="Simulation cancelled.\n" + (self.format_simulation_result(result) if result else ""))
+
+    def simulation_failed(self, error):
+        if self.simulation_job is None:
+            return
+        self.simulation_job = None
+        self.start_simulation_button.config(state=tk.NORMAL)
+        self.cancel_simulation_button.config(state=tk.DISABLED)
+        messagebox.showerror("Simulation Failed", f"The simulation stopped with an error: {error}")
+
+    def format_simulation_result(self, result):
+        return (f"Rounds played: {result['rounds']}\n"
+                f"Net result: {result['net']:+.1f} units\n"
+                f"Player edge: {result['ev'] * 100:+.3f}% (+/- {1.96 * result['stderr'] * 100:.3f}%)")
+
+    def cancel_simulation(self):
+        if self.simulation_job:
+            self.simulation_job.cancel()
+
+    def leave_simulation_screen(self):
+        if self.simulation_job:
+            self.simulation_job.cancel()
+            self.simulation_job = None
+        self.create_main_menu()
+
+    def clear_window(self):
+        for widget in self.root.winfo_children():
+            widget.destroy()
+
+    def start_game(self):
+        try:
+            bet = float(self.bet_entry.get())
+            side_bets = {name: float(entry.get() or 0) for name, entry in self.side_bet_entries.items()}
+            if bet > 0 and min(side_bets.values()) >= 0 and bet + sum(side_bets.values()) <= self.setup.initialBankroll:
+                self.round_bankroll = self.setup.initialBankroll  # Bankroll before this round's bets, to work out its result
+                self.round_count = self.deck.true_count()
+                self.first_action = None
+                self.current_bet = bet
+                self.setup.initialBankroll -= bet  # Subtract the bet from the bankroll
+                self.side_bets.clear()
+                for name, amount in side_bets.items():
+                    if amount:
+                        self.side_bets.place(name, amount)
+                        self.setup.initialBankroll -= amount
+                self.bankroll_label.config(text=f"Bankroll: {self.setup.initialBankroll}")
+                self.playerHands = [Hand()]
+                self.dealerHand = Hand()
+                self.playerSurrendered = False
+                self.playerHands[0].add_card(self.deck.draw_card())
+                self.dealerHand.add_card(self.deck.draw_card())
+                self.playerHands[0].add_card(self.deck.draw_card())
+                self.dealerHand.add_card(self.deck.draw_card())
+                self.round_total = self.playerHands[0].get_value()
+                self.round_hand_type = hand_type(self.playerHands[0])
+                self.show_initial_hands()
+                self.settle_side_bets()
+                self.check_for_blackjack()
+                if self.setup.playWithInsurance and self.dealerHand.hand[1].rank == 'Ace':
+                    self.offer_insurance()
+            else:
+                messagebox.showerror("Invalid Bet", "Bet amount is invalid or exceeds bankroll.")
+        except ValueError:
+            messagebox.showerror("Invalid Input", "Please enter a valid number for the bet amount.")
+
+    def show_initial_hands(self):
+        self.player_hand_label.config(text=f"Player's Hand: {self.playerHands[0]}")
+        if len(self.dealerHand.hand) > 1:
+            visible_card = self.dealerHand.hand[1]
+            visible_value = Deck.values[visible_card.rank]
+            self.dealer_hand_label.config(text=f"Dealer's Hand: {visible_card.rank} of {visible_card.suit} and Hidden ({visible_value})")
+        else:
+            self.dealer_hand_label.config(text="Dealer's Hand: ")
+
+    def settle_side_bets(self):
+        results = self.side_bets.settle(self.playerHands[0].hand, self.dealerHand.hand[1], self.dealerHand.is_blackjack())
+        for name, (category, payout) in results.items():
+            if payout:
+                self.setup.initialBankroll += payout
+                winnings = payout - self.side_bets.wagers[name]
+                messagebox.showinfo("Side Bet", f"{SIDE_BET_NAMES[name]} wins with {category.replace('_', ' ')}! You win {winnings}.")
+        if results:
+            self.bankroll_label.config(text=f"Bankroll: {self.setup.initialBankroll}")
+
+    def check_for_blackjack(self):
+        if self.playerHands[0].is_blackjack():
+            if self.first_action is None:
+                self.first_action = 'blackjack'
+            dealer_value = self.dealerHand.get_value()
+            if dealer_value == 21:
+                messagebox.showinfo("Push", "Both you and the dealer have Blackjack. It's a push.")
+                self.setup.initialBankroll += self.current_bet
+            else:
+                winnings = self.current_bet * self.setup.payoutOdds
+                self.setup.initialBankroll += self.current_bet + winnings
+                messagebox.showinfo("Blackjack!", f"You have Blackjack! You win {winnings}!")
+            self.bankroll_label.config(text=f"Bankroll: {self.setup.initialBankroll}")
+            self.end_round()
+
+    def offer_insurance(self):
+        if self.side_bets.insurance:
+            return
+        ev = self.deck.insurance_ev(self.dealerHand.hand[0])
+        if messagebox.askyesno("Insurance", f"The dealer's upcard is an Ace. Do you want to buy insurance?\n\nInsurance EV for the cards left in the shoe: {ev * 100:+.1f}% of the insurance bet."):
+            insurance_cost, success = self.side_bets.buy_insurance(self.current_bet, self.setup.initialBankroll)
+            if success:
+                self.setup.initialBankroll -= insurance_cost
+                self.bankroll_label.config(text=f"Bankroll: {self.setup.initialBankroll}")
+                messagebox.showinfo("Insurance", f"Insurance bought for {insurance_cost}.")
+            else:
+                messagebox.showerror("Insurance", "You don't have enough bankroll to buy insurance.")
+
+    def record_action(self, action):
+        if self.first_action is None:
+            self.first_action = action
+        if self.store:
+            hand = self.playerHands[0]
+            options = hand_options(self.setup, hand, len(self.playerHands))
+            self.store.add_decision(self.current_bet, [card_value(card) for card in hand.hand], card_value(self.dealerHand.hand[1]), options, action)
+
+    def hit(self):
+        self.record_action('hit')
+        self.playerHands[0].add_card(self.deck.draw_card())
+        self.player_hand_label.config(text=f"Player's Hand: {self.playerHands[0]}")
+        if self.playerHands[0].get_value() > 21:
+            messagebox.showinfo("Busted", "You busted!")
+            self.end_round()
+        elif self.playerHands[0].is_blackjack():
+            self.check_for_blackjack()
+
+    def stand(self):
+        self.record_action('stand')
+        self.dealer_turn()
+        self.determine_winner()
+
+    def double_down(self):
+        self.record_action('double')
+        self.playerHands[0].add_card(self.deck.draw_card())
+        self.player_hand_label.config(text=f"Player's Hand: {self.playerHands[0]}")
+        self.current_bet *= 2
+        if self.playerHands[0].get_value() > 21:
+            messagebox.showinfo("Busted", "You busted!")
+        self.dealer_turn()
+        self.determine_winner()
+
+    def surrender(self):
+        self.record_action('surrender')
+        self.setup.initialBankroll += self.current_bet / 2  # Reclaim half the bet
+        self.bankroll_label.config(text=f"Bankroll: {self.setup.initialBankroll}")
+        messagebox.showinfo("Surrendered", f"You surrendered and reclaimed half your bet of {self.current_bet / 2}.")
+        self.end_round()
+
+    def split(self):
+        if self.playerHands[0].can_split():
+            self.record_action('split')
+            new_hand = Hand()
+            new_hand.add_card(self.playerHands[0].pop_card())
+            self.playerHands[0].add_card(self.deck.draw_card())
+            new_hand.add_card(self.deck.draw_card())
+            self.playerHands.append(new_hand)
+            self.show_initial_hands()
+        else:
+            messagebox.showerror("Invalid Split", "Cannot split the current hand.")
+
+    def dealer_turn(self):
+        while self.dealerHand.get_value() < 17 or (self.dealerHand.get_value() == 17 and not self.setup.dealerStandOnSoft17):
+            self.dealerHand.add_card(self.deck.draw_card())
+        self.dealer_hand_label.config(text=f"Dealer's Hand: {self.dealerHand}")
+
+    def determine_winner(self):
+        dealer_value = self.dealerHand.get_value()
+        for i, hand in enumerate(self.playerHands):
+            player_value = hand.get_value()
+            result = f"Player's hand {i + 1}: {hand}\nDealer's hand: {self.dealerHand}\nBet amount: {self.current_bet}\n"
+            if player_value > 21:
+                result += f"You lose. You lost {self.current_bet}."
+            elif dealer_value > 21 or player_value > dealer_value:
+                winnings = self.current_bet * 2
+                result += f"You win! You won {winnings}."
+                self.setup.initialBankroll += winnings
+            elif player_value < dealer_value:
+                result += f"Dealer wins. You lost {self.current_bet}."
+            else:
+                result += f"It's a push. You get your bet back."
+                self.setup.initialBankroll += self.current_bet
+            messagebox.showinfo("Round Result", result)
+            if self.side_bets.insurance:
+                if self.dealerHand.is_blackjack():
+                    insurance_winnings = self.side_bets.insurance_amount * 2
+                    self.setup.initialBankroll += insurance_winnings
+                    messagebox.showinfo("Insurance", f"Dealer has Blackjack. Insurance pays {insurance_winnings}.")
+                else:
+                    messagebox.showinfo("Insurance", "Dealer does not have Blackjack. Insurance lost.")
+        self.bankroll_label.config(text=f"Bankroll: {self.setup.initialBankroll}")
+        if self.setup.initialBankroll <= 0:
+            self.save_round()
+            messagebox.showinfo("Game Over", "Your bankroll is 0. Returning to main menu.")
+            self.create_main_menu()
+        else:
+            self.end_round()
+
+    def reset_bankroll(self):
+        self.setup.initialBankroll = self.initial_bankroll
+        self.bankroll_label.config(text=f"Bankroll: {self.setup.initialBankroll}")
+        if self.store:
+            self.store.set_bankroll(self.setup.initialBankroll)
+
+    def return_discard_pile_to_deck(self):
+        self.deck.return_discard_pile_to_deck()
+        messagebox.showinfo("Deck Updated", "All discarded cards have been returned to the deck and the deck has been reshuffled.")
+
+    def deck_reshuffled(self):
+        messagebox.showinfo("Deck Reshuffled", "The deck was reshuffled at the penetration level.")
+
+    def save_round(self):
+        if self.store:
+            bet = self.current_bet + sum(self.side_bets.wagers.values()) + self.side_bets.insurance_amount
+            net = self.setup.initialBankroll - self.round_bankroll
+            self.store.add_round(bet, net, self.setup.initialBankroll, Deck.values[self.dealerHand.hand[1].rank],
+                                 self.round_total, self.first_action, self.round_count, self.round_hand_type)
+
+    def end_round(self):
+        self.save_round()
+        for hand in self.playerHands:
+            hand.discard(self.deck)
+        self.dealerHand.discard(self.deck)
+        if self.setup.autoReshuffle:
+            if not self.deck.csm:
+                self.deck.start_csm(self.setup.csmShelves, self.setup.csmShelfSize, self.setup.csmBufferSize)
+            else:
+                self.deck.return_discard_pile_to_deck()
+        elif self.deck.csm:
+            self.deck.stop_csm()
+        if messagebox.askyesno("Play Again", "Do you want to play another round?"):
+            self.create_game_screen()
+        else:
+            self.create_main_menu()
+
+def main():
+    root = tk.Tk()
+    setup = GameSetup()
+    store = SessionStore()
+    initial_bankroll = store.load_setup(setup)
+    deck = Deck(int(setup.playerChooseNumDecks), float(setup.deckPenetration), verbose=True)
+    game = KingOfBlackjack(setup, deck, root, store, initial_bankroll)
+    root.protocol('WM_DELETE_WINDOW', root.quit)  # Closing the window leaves mainloop the same way the Exit button does
+    try:
+        root.mainloop()
+    finally:
+        game.close()
+        root.destroy()
+        store.close()
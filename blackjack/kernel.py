@@ -0,0 +1,71 @@
+from array import array
+
+from .core import Deck
+from .solver import card_value, hand_value
+
+# A dealer hand is a state number, hard total * 2 + 1 if it holds an Ace, with card values as in the solver
+# (Ace = 1). Drawing, the stand test and the final total are all table lookups, so finishing a hand costs a few
+# list indexings per card instead of rebuilding its value from its cards.
+MAX_HARD = 26  # 16 plus a ten is the most a dealer can reach
+STATES = 2 * (MAX_HARD + 1)
+BUST = 22
+
+def state_value(state):
+    return hand_value(state >> 1, state & 1)
+
+def build_next():
+    table = array('B', bytes(STATES * 11))
+    for state in range(STATES):
+        for value in range(1, 11):
+            hard = min((state >> 1) + value, MAX_HARD)
+            table[state * 11 + value] = 2 * hard + ((state & 1) | (value == 1))
+    return table
+
+def build_draws(standSoft17):
+    draws = bytearray(STATES)
+    for state in range(STATES):
+        value = state_value(state)
+        soft = state & 1 and value != state >> 1
+        draws[state] = value < 17 or (value == 17 and soft and not standSoft17)
+    return bytes(draws)
+
+RANK_VALUES = {rank: 1 if rank == 'Ace' else value for rank, value in Deck.values.items()}
+NEXT = build_next()
+DRAWS = {True: build_draws(True), False: build_draws(False)}
+FINAL = bytes(min(state_value(state), BUST) for state in range(STATES))
+
+def dealer_kernel(holeCards, upcards, shoes, cursors, standSoft17=True):
+    # Finishes many dealer hands together. Hand i starts with holeCards[i] and upcards[i] and draws from
+    # shoes[i] (card values in dealing order) at cursors[i], which is moved past the cards taken. Each pass
+    # deals one card to every hand still drawing, then masks out the hands that now stand.
+    draws = DRAWS[standSoft17]
+    states = [NEXT[NEXT[up] * 11 + hole] for hole, up in zip(holeCards, upcards)]
+    start = array('l', cursors)
+    active = [i for i, state in enumerate(states) if draws[state]]
+    while active:
+        for i in active:
+            cursor = cursors[i]
+            states[i] = NEXT[states[i] * 11 + shoes[i][cursor]]
+            cursors[i] = cursor + 1
+        active = [i for i in active if draws[states[i]]]
+    totals = array('B', [FINAL[state] for state in states])
+    consumed = array('l', [cursor - first for cursor, first in zip(cursors, start)])
+    return totals, consumed
+
+def hand_state(hand):
+    return 2 * (hand.total - 10 * hand.aces) + (hand.aces > 0)
+
+def finish_hand(hand, deck, standSoft17=True):
+    # The same tables for a single dealer Hand drawing from a Deck
+    draws = DRAWS[standSoft17]
+    state = hand_state(hand)
+    while draws[state]:
+        card = deck.draw_card()
+        if not card:
+            break
+        hand.add_card(card)
+        state = NEXT[state * 11 + RANK_VALUES[card.rank]]
+
+def deal_order(deck):
+    # The values of the cards left in a Deck, in the order draw_card would deal them
+    return bytes(card_value(card) for card in reversed(deck.cards))
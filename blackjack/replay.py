@@ -0,0 +1,83 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+from .core import Deck
+from .simulation import RoundPool, play_round
+from .stats import RunningStats
+from .strategy import basic_strategy
+
+# Rules that change the shoe itself, which a recorded shoe already fixes
+SHOE_RULES = ('playerChooseNumDecks', 'autoReshuffle', 'csmShelves', 'csmShelfSize', 'csmBufferSize', 'compositionShoe', 'infiniteDeck')
+
+def replay_shoe(setup, codes, policy, deck=None, pool=None):
+    # Deals a recorded shoe again under setup and policy: rounds start until the cut card that setup's
+    # penetration puts in the shoe, and each card comes from the recorded order whatever was decided before it.
+    # A round that runs out of recorded cards ends the shoe and is left out, as the deck would finish it from a
+    # fresh shuffle. Returns the net, the rounds played and the amount wagered.
+    if deck is None:
+        deck = Deck(len(codes) // 52 or 1, 1.0)  # Never reshuffles on its own, as the cut is handled here
+    pool = pool or RoundPool()
+    deck.load_cards([Deck.codeCards[code] for code in reversed(codes)])
+    deck.clear_discards()
+    cut = len(codes) - int(len(codes) * setup.deckPenetration)  # Where the game's own deck would reshuffle
+    net = 0
+    rounds = 0
+    wagered = 0
+    while len(deck.cards) > cut:
+        shuffles = deck.shuffles
+        result = play_round(setup, deck, policy, pool=pool)
+        if deck.shuffles != shuffles:
+            break
+        net += result.net
+        wagered += result.bet
+        rounds += 1
+    return net, rounds, wagered
+
+def replay_shoes(variants, shoes):
+    # (net, rounds, wagered) of every shoe under each (setup, policy) variant
+    decks = {}
+    pool = RoundPool()
+    rows = []
+    for codes in shoes:
+        deck = decks.get(len(codes))
+        if deck is None:
+            deck = decks[len(codes)] = Deck(len(codes) // 52 or 1, 1.0)
+        rows.append([replay_shoe(setup, codes, policy, deck, pool) for setup, policy in variants])
+    return rows
+
+def replay(shoes, setupA, setupB=None, policyA=basic_strategy, policyB=basic_strategy, workers=1):
+    # Counterfactual replay of recorded shoes under two variants (rules and policy). Both play exactly the cards
+    # that were dealt, so the difference between them is measured on common random numbers, with the interval
+    # from the spread of the per-shoe differences (a ratio estimate, as the variants may play different numbers
+    # of rounds from a shoe).
+    setupB = setupB or setupA
+    for setup in (setupA, setupB):
+        if setup.autoReshuffle or setup.compositionShoe or setup.infiniteDeck:
+            raise ValueError("Recorded shoes are replayed from the order they were dealt in, not through a shuffling machine or a "
+                             "composition shoe")
+    if any(getattr(setupA, name) != getattr(setupB, name) for name in SHOE_RULES):
+        raise ValueError("Recorded shoes keep the decks they were dealt with, so rules that change the shoe cannot be compared")
+    variants = ((setupA, policyA), (setupB, policyB))
+    if workers == 1:
+        rows = replay_shoes(variants, shoes)
+    else:
+        blocks = [shoes[start:start + 256] for start in range(0, len(shoes), 256)]
+        with ProcessPoolExecutor(workers) as pool:
+            rows = [row for block in pool.map(replay_shoes, [variants] * len(blocks), blocks) for row in block]
+    totals = [[sum(row[variant][field] for row in rows) for field in range(3)] for variant in range(2)]
+    edges = [net / rounds if rounds else 0.0 for net, rounds, _ in totals]
+    # Each shoe's contribution to edge A minus edge B, to first order in the shoe's deviation from the totals
+    roundsPerShoe = [rounds / len(rows) if rows else 1 for _, rounds, _ in totals]
+    contributions = RunningStats()
+    for row in rows:
+        contributions.add(sum(sign * (row[variant][0] - edges[variant] * row[variant][1]) / roundsPerShoe[variant]
+                              for variant, sign in ((0, 1), (1, -1))))
+    return {
+        'shoes': len(rows),
+        'rounds_a': totals[0][1],
+        'rounds_b': totals[1][1],
+        'edge_a': edges[0],
+        'edge_b': edges[1],
+        'difference': edges[0] - edges[1],
+        'stderr': contributions.stderr if len(rows) > 1 else math.inf,
+    }
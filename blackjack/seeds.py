@@ -0,0 +1,7 @@
+import hashlib
+
+def derive_seed(seed, *path):
+    # The seed of the stream at path below seed, e.g. derive_seed(run, 'table', 3). Every path gives an
+    # independent 64 bit seed that depends on nothing but the run seed and the path, so any stream can be
+    # rebuilt on its own, in any process and in any order.
+    return int.from_bytes(hashlib.blake2b(repr((seed,) + path).encode(), digest_size=8).digest(), 'little')
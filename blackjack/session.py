@@ -0,0 +1,291 @@
+import json
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)",  # Values are JSON
+    "CREATE TABLE IF NOT EXISTS rounds (id INTEGER PRIMARY KEY, time REAL NOT NULL, bet REAL NOT NULL, net REAL NOT NULL,"
+    " bankroll REAL NOT NULL, upcard INTEGER, playerTotal INTEGER, action TEXT, count REAL, handType INTEGER, countBucket INTEGER)",
+    # Every choice the player made; cards are solver values (Ace = 1) and options the actions that were on offer
+    "CREATE TABLE IF NOT EXISTS decisions (id INTEGER PRIMARY KEY, session REAL NOT NULL, time REAL NOT NULL, bet REAL NOT NULL,"
+    " playerCards TEXT NOT NULL, upcard INTEGER NOT NULL, options TEXT NOT NULL, action TEXT NOT NULL)",
+    # Every shoe dealt, as the card codes (rank * 4 + suit) in the order they come out, for replay under other play
+    "CREATE TABLE IF NOT EXISTS shoes (id INTEGER PRIMARY KEY, session REAL NOT NULL, time REAL NOT NULL, cards BLOB NOT NULL)",
+)
+DECISION_COLUMNS = ('session', 'time', 'bet', 'playerCards', 'upcard', 'options', 'action')
+# Columns added to rounds after the first release, with the statement that fills them in for older rows. Only a
+# split shows what an older starting hand was, so the rest are 'unknown' and still counted by situation().
+ADDED_COLUMNS = (
+    ('handType', "INTEGER", "UPDATE rounds SET handType = CASE WHEN action = 'split' THEN 2 ELSE 3 END"),
+    ('countBucket', "INTEGER", "UPDATE rounds SET countBucket = CAST(count AS INTEGER) - (count < CAST(count AS INTEGER))"),
+)
+# Situation lookups walk this index and never touch the table, as it also holds the columns they add up
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS rounds_situation ON rounds (playerTotal, handType, upcard, countBucket, action, bet, net)",
+    "CREATE INDEX IF NOT EXISTS decisions_session ON decisions (session)",
+    "CREATE INDEX IF NOT EXISTS shoes_session ON shoes (session)",
+)
+ROUND_COLUMNS = ('time', 'bet', 'net', 'bankroll', 'upcard', 'playerTotal', 'action', 'count', 'handType', 'countBucket')
+HAND_TYPES = ('hard', 'soft', 'pair', 'unknown')  # Stored by position; a pair of Aces counts as a pair
+HAND_TYPE_CODES = {handType: code for code, handType in enumerate(HAND_TYPES)}
+# Every value the leading index columns can take, so a lookup that leaves one open still seeks instead of scanning
+SITUATION_VALUES = (('playerTotal', range(4, 22)), ('handType', range(len(HAND_TYPES))), ('upcard', range(2, 12)))
+
+def default_session_path():
+    return os.path.join(os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share'), 'blackjack', 'session.db')
+
+def round_row(time, bet, net, bankroll, upcard, playerTotal, action, count, handType):
+    countBucket = None if count is None else math.floor(count)
+    return (time, bet, net, bankroll, upcard, playerTotal, action, count, HAND_TYPE_CODES.get(handType, HAND_TYPE_CODES['unknown']),
+            countBucket)
+
+def connect(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")  # Readers never wait for the writer and a commit is one append
+    connection.execute("PRAGMA synchronous=FULL")  # A committed batch survives a power cut, and commits are rare
+    return connection
+
+class SessionStore:
+    # Settings, the bankroll and a summary of every round played, kept in SQLite. Writes go through a queue to a
+    # writer thread that commits them together every batchRounds rounds or batchMillis milliseconds, whichever
+    # comes first, so playing a hand never waits on the disk and a crash loses at most the batch being gathered.
+    def __init__(self, path=None, batchRounds=100, batchMillis=500, timeout=60):
+        self.path = path or default_session_path()
+        self.batchRounds = batchRounds
+        self.batchMillis = batchMillis
+        self.timeout = timeout  # Seconds flush and close wait for the writer
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = connect(self.path)  # For reads on the thread that opened the store
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+            existing = {row[1] for row in self.connection.execute("PRAGMA table_info(rounds)")}
+            for name, kind, fill in ADDED_COLUMNS:
+                if name not in existing:
+                    self.connection.execute(f"ALTER TABLE rounds ADD COLUMN {name} {kind}")
+                    if fill:
+                        self.connection.execute(fill)
+            for statement in INDEXES:
+                self.connection.execute(statement)
+        self.session = time.time()  # Identifies the decisions made while this store is open
+        self.queue = queue.Queue(256)  # Bulk loads wait here rather than outrun the disk
+        self.batches = 0
+        self.error = None  # Whatever stopped the writer thread
+        self.writer = threading.Thread(target=self.write_batches, name='session-writer', daemon=True)
+        self.writer.start()
+
+    def add_round(self, bet, net, bankroll, upcard=None, playerTotal=None, action=None, count=None, handType=None):
+        self.put('rounds', [round_row(time.time(), bet, net, bankroll, upcard, playerTotal, action, count, handType)])
+        self.put('setting', ('bankroll', bankroll))
+
+    def add_results(self, results, bankroll=0, chunkRounds=10000):
+        # Simulated RoundResults, queued in chunks; bankroll is the balance before the first of them
+        rows = []
+        for result in results:
+            bankroll += result.net
+            rows.append(round_row(time.time(), result.bet, result.net, bankroll, result.upcard, result.playerTotal,
+                                  result.action, result.count, result.handType))
+            if len(rows) >= chunkRounds:
+                self.put('rounds', rows)
+                rows = []
+        self.put('rounds', rows)
+        self.put('setting', ('bankroll', bankroll))
+        return bankroll
+
+    def add_decision(self, bet, playerCards, upcard, options, action):
+        self.put('decisions', [(self.session, time.time(), bet, ','.join(map(str, playerCards)), upcard, ','.join(options), action)])
+
+    def add_shoe(self, cards):
+        self.put('shoes', [(self.session, time.time(), cards)])
+
+    def set_bankroll(self, amount):
+        self.put('setting', ('bankroll', amount))
+
+    def save_settings(self, settings):
+        for name, value in settings.items():
+            self.put('setting', (name, value))
+        self.flush()  # Settings are saved rarely and the player expects them to stick straight away
+
+    def check_writer(self):
+        if self.error is not None:
+            raise self.error
+
+    def put(self, kind, item):
+        # Waits while the queue is full, but not on a writer that has stopped
+        while True:
+            self.check_writer()
+            try:
+                self.queue.put((kind, item), timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def flush(self):
+        done = threading.Event()
+        self.put('flush', done)
+        deadline = time.monotonic() + self.timeout
+        while not done.wait(0.1):  # A writer that stops before it gets to this flush never sets done
+            self.check_writer()
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"The session writer did not commit within {self.timeout} s")
+        self.check_writer()
+
+    def close(self):
+        try:
+            if self.writer.is_alive():
+                self.put('close', None)
+                self.writer.join(self.timeout)
+                if self.writer.is_alive():
+                    raise TimeoutError(f"The session writer did not finish within {self.timeout} s")
+            self.check_writer()
+        finally:
+            self.connection.close()
+
+    def write_batches(self):
+        # Anything that stops the writer is kept in self.error for the next call on the store to raise, and every
+        # flush waiting on the writer is released so its caller sees the error instead of waiting forever
+        connection = None
+        kind, item = None, None
+        try:
+            connection = connect(self.path)
+            rounds = []
+            decisions = []
+            shoes = []
+            settings = {}  # Only the latest value of each setting in a batch is written
+            deadline = None
+            running = True
+            while running:
+                try:
+                    timeout = None if deadline is None else max(0, deadline - time.monotonic())
+                    kind, item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    kind, item = 'timeout', None
+                if kind == 'rounds':
+                    rounds.extend(item)
+                elif kind == 'decisions':
+                    decisions.extend(item)
+                elif kind == 'shoes':
+                    shoes.extend(item)
+                elif kind == 'setting':
+                    settings[item[0]] = item[1]
+                elif kind == 'close':
+                    running = False
+                if deadline is None and (rounds or decisions or shoes or settings):
+                    deadline = time.monotonic() + self.batchMillis / 1000
+                if kind != 'flush' and running and len(rounds) < self.batchRounds and (deadline is None or time.monotonic() < deadline):
+                    continue
+                if rounds or decisions or shoes or settings:
+                    with connection:
+                        connection.executemany(f"INSERT INTO rounds ({', '.join(ROUND_COLUMNS)}) VALUES ({', '.join('?' * len(ROUND_COLUMNS))})", rounds)
+                        connection.executemany(f"INSERT INTO decisions ({', '.join(DECISION_COLUMNS)}) VALUES ({', '.join('?' * len(DECISION_COLUMNS))})", decisions)
+                        connection.executemany("INSERT INTO shoes (session, time, cards) VALUES (?, ?, ?)", shoes)
+                        connection.executemany("INSERT OR REPLACE INTO settings (name, value) VALUES (?, ?)",
+                                               [(name, json.dumps(value)) for name, value in settings.items()])
+                    self.batches += 1
+                    rounds = []
+                    decisions = []
+                    shoes = []
+                    settings = {}
+                deadline = None
+                if kind == 'flush':
+                    item.set()
+        except BaseException as error:
+            self.error = error
+        finally:
+            if connection is not None:
+                connection.close()
+            if kind == 'flush':
+                item.set()
+            while True:
+                try:
+                    kind, item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if kind == 'flush':
+                    item.set()
+
+    def settings(self):
+        return {name: json.loads(value) for name, value in self.connection.execute("SELECT name, value FROM settings")}
+
+    def load_setup(self, setup):
+        # Puts the saved rules and bankroll into a GameSetup and returns the starting bankroll used for resets
+        settings = self.settings()
+        for name in setup.ruleNames:
+            if name in settings:
+                setattr(setup, name, settings[name])
+        initialBankroll = settings.get('initialBankroll', setup.initialBankroll)
+        setup.initialBankroll = settings.get('bankroll', initialBankroll)
+        return initialBankroll
+
+    def recent_rounds(self, limit=10):
+        cursor = self.connection.execute(f"SELECT {', '.join(ROUND_COLUMNS)} FROM rounds ORDER BY id DESC LIMIT ?", (limit,))
+        return [dict(zip(ROUND_COLUMNS, row)) for row in cursor]
+
+    def situation(self, playerTotal=None, handType=None, upcard=None, minCount=None, maxCount=None):
+        # Rounds, total wagered and net result for each first action in the rounds that started in a situation
+        chosen = {'playerTotal': playerTotal, 'handType': None if handType is None else HAND_TYPE_CODES[handType], 'upcard': upcard}
+        clauses = []
+        parameters = []
+        for name, values in SITUATION_VALUES:
+            if chosen[name] is None:
+                clauses.append(f"{name} IN ({', '.join(str(value) for value in values)})")
+            else:
+                clauses.append(f"{name} = ?")
+                parameters.append(chosen[name])
+        if minCount is not None:
+            clauses.append("countBucket >= ?")
+            parameters.append(minCount)
+        if maxCount is not None:
+            clauses.append("countBucket <= ?")
+            parameters.append(maxCount)
+        cursor = self.connection.execute(f"SELECT action, COUNT(*), TOTAL(bet), TOTAL(net) FROM rounds INDEXED BY rounds_situation "
+                                         f"WHERE {' AND '.join(clauses)} GROUP BY action", parameters)
+        return {action: {'rounds': rounds, 'wagered': wagered, 'net': net, 'ev': net / rounds}
+                for action, rounds, wagered, net in cursor}
+
+    def sessions(self):
+        return [session for session, in self.connection.execute("SELECT DISTINCT session FROM decisions ORDER BY session")]
+
+    def decisions(self, session=None):
+        # (bet, playerCards, upcard, options, action) for every decision in a session, or in all of them
+        query = "SELECT bet, playerCards, upcard, options, action FROM decisions"
+        cursor = self.connection.execute(query + " WHERE session = ? ORDER BY id", (session,)) if session is not None else self.connection.execute(query + " ORDER BY id")
+        return [(bet, tuple(int(value) for value in playerCards.split(',')), upcard, tuple(options.split(',')), action)
+                for bet, playerCards, upcard, options, action in cursor]
+
+    def shoes(self, session=None):
+        # The recorded shoes of a session, or of all of them, each as bytes of card codes in dealing order
+        query = "SELECT cards FROM shoes"
+        cursor = self.connection.execute(query + " WHERE session = ? ORDER BY id", (session,)) if session is not None else self.connection.execute(query + " ORDER BY id")
+        return [bytes(cards) for cards, in cursor]
+
+    def shoe_sessions(self):
+        return [session for session, in self.connection.execute("SELECT DISTINCT session FROM shoes ORDER BY session")]
+
+    def summary(self):
+        rounds, wagered, net = self.connection.execute("SELECT COUNT(*), TOTAL(bet), TOTAL(net) FROM rounds").fetchone()
+        return {'rounds': rounds, 'wagered': wagered, 'net': net, 'bankroll': self.settings().get('bankroll')}
+
+class ShoeRecorder:
+    # A Deck observer that saves the order of every shoe the deck deals from. The order is taken at the shuffle
+    # and saved at the first card dealt, so a shoe that goes straight into a shuffling machine, or a composition
+    # shoe with no order at all, is not recorded.
+    def __init__(self, store, deck):
+        self.store = store
+        self.pending = None
+        deck.observers.append(self)
+        self.deck = deck
+        self.deck_shuffled(deck)  # The shoe already in the deck
+
+    def card_drawn(self, card):
+        if self.pending is not None:
+            if self.deck.csm is None:
+                self.store.add_shoe(self.pending)
+            self.pending = None
+
+    def deck_shuffled(self, deck):
+        self.pending = bytes(deck.cardCodes[card] for card in reversed(deck.cards)) if deck.csm is None and deck.cards else None
@@ -0,0 +1,167 @@
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
+SUITS = ['Clubs', 'Diamonds', 'Hearts', 'Spades']
+RED_SUITS = ('Diamonds', 'Hearts')
+PARTNER_SUITS = {'Clubs': 'Spades', 'Spades': 'Clubs', 'Diamonds': 'Hearts', 'Hearts': 'Diamonds'}  # Same colour, different suit
+TEN_RANKS = ('10', 'Jack', 'Queen', 'King')
+STRAIGHTS = [(RANKS[i], RANKS[i + 1], RANKS[i + 2]) for i in range(11)] + [('Ace', '2', '3')]
+STRAIGHT_RANKS = [frozenset(straight) for straight in STRAIGHTS]
+
+# Payouts are "to one" for each winning category
+PERFECT_PAIRS_PAYTABLE = {'perfect': 25, 'colored': 12, 'mixed': 6}
+TWENTY_ONE_THREE_PAYTABLE = {'suited_trips': 100, 'straight_flush': 40, 'three_of_a_kind': 30, 'straight': 10, 'flush': 5}
+LUCKY_LADIES_PAYTABLE = {'queen_hearts_dealer_blackjack': 1000, 'queen_hearts': 200, 'matched': 25, 'suited': 10, 'any': 4}
+SIDE_BET_NAMES = {'perfect_pairs': 'Perfect Pairs', 'twenty_one_three': '21+3', 'lucky_ladies': 'Lucky Ladies'}
+PAYTABLES = {'perfect_pairs': PERFECT_PAIRS_PAYTABLE, 'twenty_one_three': TWENTY_ONE_THREE_PAYTABLE, 'lucky_ladies': LUCKY_LADIES_PAYTABLE}
+
+def perfect_pairs_result(cards):
+    first, second = cards[:2]
+    if first.rank != second.rank:
+        return None
+    if first.suit == second.suit:
+        return 'perfect'
+    if (first.suit in RED_SUITS) == (second.suit in RED_SUITS):
+        return 'colored'
+    return 'mixed'
+
+def twenty_one_three_result(cards):
+    ranks = set(card.rank for card in cards)
+    flush = len(set(card.suit for card in cards)) == 1
+    if len(ranks) == 1:
+        return 'suited_trips' if flush else 'three_of_a_kind'
+    if ranks in STRAIGHT_RANKS:
+        return 'straight_flush' if flush else 'straight'
+    return 'flush' if flush else None
+
+def lucky_ladies_result(cards, dealerBlackjack):
+    first, second = cards[:2]
+    values = {'Ace': 11, '9': 9, **dict.fromkeys(TEN_RANKS, 10)}
+    if values.get(first.rank, 0) + values.get(second.rank, 0) != 20:
+        return None
+    if first == second:
+        if first.rank == 'Queen' and first.suit == 'Hearts':
+            return 'queen_hearts_dealer_blackjack' if dealerBlackjack else 'queen_hearts'
+        return 'matched'
+    return 'suited' if first.suit == second.suit else 'any'
+
+class SideBetOdds:
+    # Exact side bet probabilities for the cards left in a Deck. Every sum below is a count of ordered draws
+    # kept up to date in constant time as each card leaves the shoe, so the EVs can be read after every card.
+    def __init__(self, deck, paytables=None):
+        self.paytables = {**PAYTABLES, **(paytables or {})}
+        self.deck = deck
+        deck.observers.append(self)
+        self.deck_shuffled(deck)
+
+    def deck_shuffled(self, deck):
+        self.n = {rank: dict.fromkeys(SUITS, 0) for rank in RANKS}
+        self.total = 0
+        for card in deck.remaining_cards():
+            self.n[card.rank][card.suit] += 1
+            self.total += 1
+        n = self.n
+        self.rankTotals = {rank: sum(n[rank].values()) for rank in RANKS}
+        self.suitTotals = {suit: sum(n[rank][suit] for rank in RANKS) for suit in SUITS}
+        self.tensBySuit = {suit: sum(n[rank][suit] for rank in TEN_RANKS) for suit in SUITS}
+        cells = [n[rank][suit] for rank in RANKS for suit in SUITS]
+        self.perfectPairs = sum(c * (c - 1) for c in cells)
+        self.coloredPairs = sum(2 * n[rank]['Hearts'] * n[rank]['Diamonds'] + 2 * n[rank]['Clubs'] * n[rank]['Spades'] for rank in RANKS)
+        self.rankPairs = sum(m * (m - 1) for m in self.rankTotals.values())
+        self.suitedTrips = sum(c * (c - 1) * (c - 2) for c in cells)
+        self.trips = sum(m * (m - 1) * (m - 2) for m in self.rankTotals.values())
+        self.sameSuit = sum(t * (t - 1) * (t - 2) for t in self.suitTotals.values())
+        self.straights = sum(6 * self.rankTotals[a] * self.rankTotals[b] * self.rankTotals[c] for a, b, c in STRAIGHTS)
+        self.straightFlushes = sum(6 * n[a][suit] * n[b][suit] * n[c][suit] for a, b, c in STRAIGHTS for suit in SUITS)
+        self.identicalTens = sum(n[rank][suit] * (n[rank][suit] - 1) for rank in TEN_RANKS for suit in SUITS)
+        self.suitedAceNines = sum(n['Ace'][suit] * n['9'][suit] for suit in SUITS)
+
+    def card_drawn(self, card):
+        rank, suit = card.rank, card.suit
+        n = self.n
+        c = n[rank][suit]
+        m = self.rankTotals[rank]
+        t = self.suitTotals[suit]
+        self.perfectPairs -= 2 * (c - 1)
+        self.coloredPairs -= 2 * n[rank][PARTNER_SUITS[suit]]
+        self.rankPairs -= 2 * (m - 1)
+        self.suitedTrips -= 3 * (c - 1) * (c - 2)
+        self.trips -= 3 * (m - 1) * (m - 2)
+        self.sameSuit -= 3 * (t - 1) * (t - 2)
+        for straight in STRAIGHTS:
+            if rank in straight:
+                others = [other for other in straight if other != rank]
+                self.straights -= 6 * self.rankTotals[others[0]] * self.rankTotals[others[1]]
+                self.straightFlushes -= 6 * n[others[0]][suit] * n[others[1]][suit]
+        if rank in TEN_RANKS:
+            self.identicalTens -= 2 * (c - 1)
+            self.tensBySuit[suit] -= 1
+        elif rank == 'Ace':
+            self.suitedAceNines -= n['9'][suit]
+        elif rank == '9':
+            self.suitedAceNines -= n['Ace'][suit]
+        n[rank][suit] = c - 1
+        self.rankTotals[rank] = m - 1
+        self.suitTotals[suit] = t - 1
+        self.total -= 1
+
+    def expected_value(self, probabilities, paytable):
+        win = sum(probabilities.values())
+        return sum(probabilities[category] * paytable[category] for category in probabilities) - (1 - win)
+
+    def perfect_pairs_probabilities(self):
+        pairs = self.total * (self.total - 1)
+        if not pairs:
+            return dict.fromkeys(PERFECT_PAIRS_PAYTABLE, 0)
+        return {
+            'perfect': self.perfectPairs / pairs,
+            'colored': self.coloredPairs / pairs,
+            'mixed': (self.rankPairs - self.perfectPairs - self.coloredPairs) / pairs,
+        }
+
+    def twenty_one_three_probabilities(self):
+        triples = self.total * (self.total - 1) * (self.total - 2)
+        if not triples:
+            return dict.fromkeys(TWENTY_ONE_THREE_PAYTABLE, 0)
+        return {
+            'suited_trips': self.suitedTrips / triples,
+            'straight_flush': self.straightFlushes / triples,
+            'three_of_a_kind': (self.trips - self.suitedTrips) / triples,
+            'straight': (self.straights - self.straightFlushes) / triples,
+            'flush': (self.sameSuit - self.straightFlushes - self.suitedTrips) / triples,
+        }
+
+    def lucky_ladies_probabilities(self):
+        total = self.total
+        pairs = total * (total - 1)
+        if total < 4:
+            return dict.fromkeys(LUCKY_LADIES_PAYTABLE, 0)
+        tens = sum(self.tensBySuit.values())
+        aces = self.rankTotals['Ace']
+        queens = self.n['Queen']['Hearts']
+        queenPairs = queens * (queens - 1)
+        # After two Queens of Hearts leave the shoe the dealer needs an Ace and one of the remaining tens
+        dealerBlackjack = 2 * aces * (tens - 2) / ((total - 2) * (total - 3))
+        suited = sum(t * (t - 1) for t in self.tensBySuit.values()) + 2 * self.suitedAceNines
+        anyTwenty = tens * (tens - 1) + 2 * aces * self.rankTotals['9']
+        return {
+            'queen_hearts_dealer_blackjack': queenPairs * dealerBlackjack / pairs,
+            'queen_hearts': queenPairs * (1 - dealerBlackjack) / pairs,
+            'matched': (self.identicalTens - queenPairs) / pairs,
+            'suited': (suited - self.identicalTens) / pairs,
+            'any': (anyTwenty - suited) / pairs,
+        }
+
+    def perfect_pairs_ev(self):
+        return self.expected_value(self.perfect_pairs_probabilities(), self.paytables['perfect_pairs'])
+
+    def twenty_one_three_ev(self):
+        return self.expected_value(self.twenty_one_three_probabilities(), self.paytables['twenty_one_three'])
+
+    def lucky_ladies_ev(self):
+        return self.expected_value(self.lucky_ladies_probabilities(), self.paytables['lucky_ladies'])
+
+    def evs(self):
+        return {
+            'perfect_pairs': self.perfect_pairs_ev(),
+            'twenty_one_three': self.twenty_one_three_ev(),
+            'lucky_ladies': self.lucky_ladies_ev(),
+        }
@@ -0,0 +1,316 @@
+import gc
+import itertools
+import os
+import random
+import tracemalloc
+from collections import deque, namedtuple
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+from .core import CompositionDeck, Deck, HandPool
+from .kernel import finish_hand
+from .seeds import derive_seed
+from .stats import SimulationStats
+from .strategy import basic_strategy
+
+MAX_SPLIT_HANDS = 4
+
+# handsWon, handsPushed and handsLost count the player's hands, each split hand on its own, by how they ended
+RoundResult = namedtuple('RoundResult', ['net', 'bet', 'upcard', 'playerTotal', 'action', 'count', 'handType', 'handsWon',
+                                         'handsPushed', 'handsLost'])
+
+# Every set of options a hand can be offered, indexed by double + 2 * split + 4 * surrender, so no list is built per decision
+OPTIONS = [tuple(['hit', 'stand'] + ['double'] * bool(i & 1) + ['split'] * bool(i & 2) + ['surrender'] * bool(i & 4)) for i in range(8)]
+
+class RoundPool:
+    # The hands and the lists holding them are kept from one round to the next, so a round creates no new containers
+    __slots__ = ('hands', 'bets', 'spare', 'handsPlayed')
+
+    def __init__(self):
+        self.hands = []
+        self.bets = []
+        self.spare = HandPool()
+        self.handsPlayed = 0  # Player hands, counting each split hand, in every round played with the pool
+
+def dealer_play(setup, deck, dealerHand):
+    finish_hand(dealerHand, deck, setup.dealerStandOnSoft17)
+
+def hand_type(hand):
+    return 'pair' if hand.can_split() else 'soft' if hand.is_soft() else 'hard'
+
+def hand_options(setup, hand, numHands):
+    if len(hand.hand) != 2:
+        return OPTIONS[0]
+    return OPTIONS[1 + 2 * (hand.can_split() and numHands < MAX_SPLIT_HANDS) + 4 * (setup.playWithSurrender and numHands == 1)]
+
+def insure_when_positive(ev):
+    return ev > 0
+
+def play_hands(setup, deck, policy, hands, bets, upcard, pool):
+    # Plays the player's hands to the end, splitting into new ones as needed. Returns the first action taken and
+    # whether the hand was surrendered.
+    firstAction = None
+    surrendered = False
+    i = 0
+    while i < len(hands):
+        hand = hands[i]
+        while hand.get_value() < 21 and not (len(hands) > 1 and hand.hand[0].rank == 'Ace'):
+            options = hand_options(setup, hand, len(hands))
+            action = policy(hand, upcard, options)
+            if firstAction is None:
+                firstAction = action
+            if action == 'stand':
+                break
+            if action == 'surrender':
+                surrendered = True
+                break
+            if action == 'split':
+                new_hand = pool.spare.acquire()
+                new_hand.add_card(hand.pop_card())
+                hand.add_card(deck.draw_card())
+                new_hand.add_card(deck.draw_card())
+                hands.append(new_hand)
+                bets.append(bets[i])
+                continue
+            hand.add_card(deck.draw_card())
+            if action == 'double':
+                bets[i] *= 2
+                break
+        i += 1
+    return firstAction, surrendered
+
+def settle_hands(setup, deck, dealerHand, hands, bets):
+    # The dealer plays if any hand is still standing. Returns the net of every hand against the dealer's and how
+    # many of the hands won and lost.
+    for hand in hands:
+        if hand.get_value() <= 21:
+            dealer_play(setup, deck, dealerHand)
+            break
+    dealer_value = dealerHand.get_value()
+    net = 0
+    won = 0
+    lost = 0
+    for hand, handBet in zip(hands, bets):
+        player_value = hand.get_value()
+        if player_value > 21:
+            net -= handBet
+            lost += 1
+        elif dealer_value > 21 or player_value > dealer_value:
+            net += handBet
+            won += 1
+        elif player_value < dealer_value:
+            net -= handBet
+            lost += 1
+    return net, won, lost
+
+def play_round(setup, deck, policy, bet=1, insure=insure_when_positive, pool=None):
+    if pool is None:
+        pool = RoundPool()
+    count = deck.true_count()
+    playerHand = pool.spare.acquire()
+    dealerHand = pool.spare.acquire()
+    playerHand.add_card(deck.draw_card())
+    dealerHand.add_card(deck.draw_card())
+    playerHand.add_card(deck.draw_card())
+    dealerHand.add_card(deck.draw_card())
+    upcard = dealerHand.hand[1]
+    playerTotal = playerHand.get_value()
+    handType = hand_type(playerHand)
+    hands = pool.hands
+    hands.append(playerHand)
+    bets = pool.bets
+    bets.append(bet)
+    net = 0
+    won = 0
+    lost = 0
+    surrendered = False
+    insurance = 0
+    if setup.playWithInsurance and upcard.rank == 'Ace' and insure(deck.insurance_ev(dealerHand.hand[0])):
+        insurance = bet / 2
+        net += 2 * insurance if dealerHand.is_blackjack() else -insurance
+    if playerHand.is_blackjack() or dealerHand.is_blackjack():
+        firstAction = 'blackjack'
+        if not dealerHand.is_blackjack():
+            net += bet * setup.payoutOdds
+            won = 1
+        elif not playerHand.is_blackjack():
+            net -= bet
+            lost = 1
+    else:
+        firstAction, surrendered = play_hands(setup, deck, policy, hands, bets, upcard, pool)
+        if surrendered:
+            net -= bet / 2
+        else:
+            handsNet, won, lost = settle_hands(setup, deck, dealerHand, hands, bets)
+            net += handsNet
+    wagered = sum(bets) + insurance
+    pushed = 0 if surrendered else len(hands) - won - lost
+    for hand in hands:
+        deck.add_to_discard_pile(hand.hand)
+        pool.spare.release(hand)
+    deck.add_to_discard_pile(dealerHand.hand)
+    pool.spare.release(dealerHand)
+    pool.handsPlayed += len(hands)
+    hands.clear()
+    bets.clear()
+    if setup.autoReshuffle:
+        deck.return_discard_pile_to_deck()
+    return RoundResult(net, wagered, Deck.values[upcard.rank], playerTotal, firstAction, count, handType, won, pushed, lost)
+
+def new_deck(setup, seed=None):
+    if setup.compositionShoe or setup.infiniteDeck:
+        deck = CompositionDeck(setup.playerChooseNumDecks, setup.deckPenetration, infinite=setup.infiniteDeck, seed=seed)
+    else:
+        deck = Deck(setup.playerChooseNumDecks, setup.deckPenetration, seed=seed)
+    if setup.autoReshuffle:
+        deck.start_csm(setup.csmShelves, setup.csmShelfSize, setup.csmBufferSize)
+    return deck
+
+def iter_rounds(setup, rounds, seed=None, policy=basic_strategy, job=None, deck=None):
+    if seed is not None:
+        random.seed(seed)
+    if deck is None:
+        deck = new_deck(setup)
+    pool = RoundPool()
+    completed = 0
+    while completed < rounds and not (job and job.cancelled):
+        yield play_round(setup, deck, policy, pool=pool)
+        completed += 1
+        if job and completed % 1000 == 0:
+            job.report_progress(completed / rounds)
+
+def allocation_check(setup, rounds, seed=None, warmup=2000):
+    # What the round loop allocates once a warm up has filled the pools and built the shoe. A round still creates
+    # a few objects: its RoundResult, and floats for the true count and any fractional net. Those are freed when
+    # the next round replaces them, so each round is measured on its own for the most memory it had allocated at
+    # once (peak, and its mean over the rounds), and this package's memory halfway through is compared with the
+    # end for anything left behind as rounds go on (growth). Such a loop never sets off the cyclic garbage collector.
+    results = iter_rounds(setup, warmup + rounds, seed)
+    for _ in itertools.islice(results, warmup):
+        pass
+    gc.collect()
+    collections = sum(generation['collections'] for generation in gc.get_stats())
+    traced = tracemalloc.get_traced_memory
+    peak = 0
+    total = 0
+    tracemalloc.start()
+    try:
+        for index in range(rounds):
+            if index == rounds // 2:
+                halfway = tracemalloc.take_snapshot()
+            current = traced()[0]
+            tracemalloc.reset_peak()
+            result = next(results)
+            allocated = traced()[1] - current
+            total += allocated
+            if allocated > peak:
+                peak = allocated
+        del result
+        end = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    collections = sum(generation['collections'] for generation in gc.get_stats()) - collections
+    package = tracemalloc.Filter(True, os.path.join(os.path.dirname(__file__), '*'))
+    differences = end.filter_traces([package]).compare_to(halfway.filter_traces([package]), 'lineno')
+    return {
+        'peak': peak,
+        'mean': total / rounds,
+        'growth': sum(difference.size_diff for difference in differences),
+        'growthBlocks': sum(difference.count_diff for difference in differences),
+        'collections': collections,
+        'largest': [str(difference) for difference in differences[:3] if difference.size_diff],
+    }
+
+def run_simulation(setup, rounds, seed=None, policy=basic_strategy, job=None):
+    stats = SimulationStats()
+    for result in iter_rounds(setup, rounds, seed, policy, job):
+        stats.add(result)
+    return stats
+
+def simulate(setup, rounds, seed=None, policy=basic_strategy, job=None):
+    return run_simulation(setup, rounds, seed, policy, job).summary()
+
+def table_seed(seed, table):
+    return derive_seed(seed, 'table', table)
+
+def run_table(setup, rounds, seed, table, policy=basic_strategy):
+    stats = SimulationStats()
+    deck = new_deck(setup, table_seed(seed, table))
+    pool = RoundPool()
+    for _ in range(rounds):
+        stats.add(play_round(setup, deck, policy, pool=pool))
+    stats.hands = pool.handsPlayed
+    stats.shuffles = deck.shuffles
+    stats.workers[os.getpid()] = rounds
+    return stats
+
+def simulate_tables(setup, rounds, seed, tables=16, workers=1, policy=basic_strategy, progress=None):
+    # The rounds are shared out over tables, each dealing its own shoes from its own seed stream, and the tables'
+    # statistics are merged in table order. The result depends on the seed and the number of tables only, so any
+    # number of workers finishing in any order gives the same numbers, down to the last bit.
+    # progress(stats, pending) is called as each table is merged, with the number of tables still to come.
+    sizes = [rounds // tables + (table < rounds % tables) for table in range(tables)]
+    stats = SimulationStats()
+    with ProcessPoolExecutor(workers) if workers > 1 else nullcontext() as pool:
+        if pool:
+            results = pool.map(run_table, itertools.repeat(setup), sizes, itertools.repeat(seed), range(tables), itertools.repeat(policy))
+        else:
+            results = (run_table(setup, size, seed, table, policy) for table, size in enumerate(sizes))
+        for table, result in enumerate(results):
+            stats.merge(result)
+            if progress:
+                progress(stats, tables - table - 1)
+    return stats
+
+def simulate_to_precision(setup, halfWidth, seed=0, confidence=0.95, chunkRounds=20000, workers=1, maxRounds=None,
+                          policy=basic_strategy, progress=None):
+    # Plays chunks of chunkRounds rounds, chunk i at table i of simulate_tables, and merges them in chunk order
+    # until the confidence interval of the player edge is no wider than +/- halfWidth, or maxRounds are played (the
+    # last chunk is cut short to stop on maxRounds exactly). Workers run ahead on later chunks, but the stop is
+    # decided on the merged chunks alone, so the rounds used and the result are the same for any number of workers.
+    # Returns the stats and whether the target was met.
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    maxChunks = -(-maxRounds // chunkRounds) if maxRounds else None
+    stats = SimulationStats()
+    executor = ProcessPoolExecutor(workers) if workers > 1 else None
+    pending = deque()
+    chunk = 0
+    try:
+        while True:
+            while len(pending) < 2 * workers and (maxChunks is None or chunk < maxChunks):
+                size = chunkRounds if maxRounds is None else min(chunkRounds, maxRounds - chunk * chunkRounds)
+                if executor:
+                    pending.append(executor.submit(run_table, setup, size, seed, chunk, policy))
+                else:
+                    pending.append((size, chunk))
+                chunk += 1
+            if not pending:
+                return stats, False
+            if executor:
+                stats.merge(pending.popleft().result())
+            else:
+                size, next_chunk = pending.popleft()
+                stats.merge(run_table(setup, size, seed, next_chunk, policy))
+            if progress:
+                progress(stats, len(pending))
+            # Two chunks at least, so a lucky first chunk's spread cannot stop the run
+            if stats.rounds >= 2 * chunkRounds and z * stats.net.stderr <= halfWidth:
+                return stats, True
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+def shoe_rounds(setup, seed, table, shoe, policy=basic_strategy):
+    # The rounds a table of simulate_tables started in its shoe-th shoe. The table is dealt again from its start,
+    # as a round that runs past the cut card carries on into the next shoe and shifts where its rounds begin.
+    deck = new_deck(setup, table_seed(seed, table))
+    pool = RoundPool()
+    while deck.shuffles <= shoe + 1:
+        started = deck.shuffles
+        result = play_round(setup, deck, policy, pool=pool)
+        if started == shoe + 1:
+            yield result
+
+def simulate_rounds(job, setup, rounds):
+    return simulate(setup, rounds, job=job)
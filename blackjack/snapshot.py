@@ -0,0 +1,174 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from .core import CompositionDeck, Deck
+from .simulation import RoundPool, play_hands, settle_hands
+from .stats import RunningStats
+from .strategy import basic_strategy
+
+CARDS, DISCARDS, RUNNING_COUNT, SHUFFLES = range(4)
+HEADER = 4 + len(Deck.ranks)  # The counters above, then how many cards of each rank have been played
+
+class ShoeSnapshot:
+    # A Deck's state in a shared memory block: a header of counters and discard rank counts, the codes of the
+    # cards left in the order the deck holds them, and the codes of the discard log. Writing one is a few byte
+    # copies into a block that is kept from one decision to the next, and a process that attaches reads it back
+    # into its own Deck without anything being pickled or written to a file.
+    def __init__(self, capacity, name=None):
+        self.capacity = capacity  # Most cards the shoe, or the discard log, can hold
+        self.owner = name is None
+        if self.owner:
+            self.memory = shared_memory.SharedMemory(create=True, size=8 * HEADER + 2 * capacity)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)  # Only the creating process unlinks it
+        self.header = self.memory.buf[:8 * HEADER].cast('q')
+        self.codes = self.memory.buf[8 * HEADER:8 * HEADER + 2 * capacity]
+
+    @classmethod
+    def for_setup(cls, setup):
+        return cls(52 * setup.playerChooseNumDecks)
+
+    def handle(self):
+        return (self.capacity, self.memory.name)
+
+    @classmethod
+    def attach(cls, capacity, name):
+        return cls(capacity, name)
+
+    def write(self, deck, unseen=()):
+        # unseen are cards already dealt but not yet shown, such as the hole card, which go back on top of the shoe
+        codes = bytes(map(Deck.cardCodes.__getitem__, deck.remaining_cards())) + bytes(map(Deck.cardCodes.__getitem__, unseen))
+        log = deck.discardLog if deck.discardLog is not None else b''
+        if len(codes) > self.capacity or len(log) > self.capacity:
+            raise ValueError(f"a snapshot holds at most {self.capacity} cards")
+        self.codes[:len(codes)] = codes
+        self.codes[self.capacity:self.capacity + len(log)] = log
+        header = self.header
+        header[CARDS] = len(codes)
+        header[DISCARDS] = len(log)
+        header[RUNNING_COUNT] = deck.runningCount
+        header[SHUFFLES] = deck.shuffles
+        for rank, count in enumerate(deck.discardCounts):
+            header[4 + rank] = count
+
+    def read(self, deck):
+        # Puts the snapshot into deck, which is dealt from the top whatever kind of shoe was snapshotted
+        header = self.header
+        deck.load_cards([Deck.codeCards[code] for code in self.codes[:header[CARDS]]])
+        deck.clear_discards()
+        deck.discardCounts[:] = header[4:]
+        if deck.discardLog is not None:
+            deck.discardLog.frombytes(self.codes[self.capacity:self.capacity + header[DISCARDS]])
+        deck.runningCount = header[RUNNING_COUNT]
+        deck.shuffles = header[SHUFFLES]
+
+    def close(self):
+        self.header.release()
+        self.codes.release()
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+def has_order(deck):
+    # Whether the cards a snapshot takes from deck are in the order they would be dealt. A shuffling machine gives
+    # its tray then its shelves, which it deals from at random, and a composition shoe only has counts.
+    return deck.csm is None and not isinstance(deck, CompositionDeck)
+
+worker_snapshot = None
+
+def attach_snapshot(handle):
+    global worker_snapshot
+    worker_snapshot = ShoeSnapshot.attach(*handle)
+
+def first_then(action, policy):
+    # A policy that takes action at the first decision and follows policy after it
+    pending = [action]
+    def choose(hand, upcard, options):
+        return pending.pop() if pending else policy(hand, upcard, options)
+    return choose
+
+def draw_hole(deck, upcard):
+    # The dealer has already checked for blackjack, so the hole card is the first from the top that does not make one
+    cards = deck.cards
+    for index in range(len(cards) - 1, -1, -1):
+        if Deck.values[cards[index].rank] + Deck.values[upcard.rank] != 21:
+            return cards.pop(index)
+    return None
+
+def play_out(setup, deck, playerCards, upcard, hole, action, policy, pool):
+    # The net of one unit bet on a round finished from the player's first decision, taking action there
+    playerHand = pool.spare.acquire()
+    for card in playerCards:
+        playerHand.add_card(card)
+    dealerHand = pool.spare.acquire()
+    dealerHand.add_card(hole)
+    dealerHand.add_card(upcard)
+    hands = pool.hands
+    hands.append(playerHand)
+    bets = pool.bets
+    bets.append(1)
+    _, surrendered = play_hands(setup, deck, first_then(action, policy), hands, bets, upcard, pool)
+    net = -0.5 if surrendered else settle_hands(setup, deck, dealerHand, hands, bets)[0]
+    for hand in hands:
+        pool.spare.release(hand)
+    pool.spare.release(dealerHand)
+    hands.clear()
+    bets.clear()
+    return net
+
+def play_alternative(setup, action, playerCodes, upcardCode, holeCode, trials, seed, policy=basic_strategy):
+    # Runs in a worker against the shared snapshot. Without a hole card the cards the player has not seen are
+    # shuffled before each trial; with one the shoe is played in the order it was really in.
+    random.seed(seed)
+    deck = Deck(setup.playerChooseNumDecks, setup.deckPenetration)
+    pool = RoundPool()
+    stats = RunningStats()
+    playerCards = [Deck.codeCards[code] for code in playerCodes]
+    upcard = Deck.codeCards[upcardCode]
+    for _ in range(trials):
+        worker_snapshot.read(deck)
+        if holeCode is None:
+            random.shuffle(deck.cards)
+            hole = draw_hole(deck, upcard)
+        else:
+            hole = Deck.codeCards[holeCode]
+        stats.add(play_out(setup, deck, playerCards, upcard, hole, action, policy, pool))
+    return action, stats
+
+class WhatIfPool:
+    # Worker processes that play out each option at a decision from a shared snapshot of the shoe. The processes
+    # and the block outlive a decision, so asking about the next one only rewrites the block. Every option is
+    # played on the same shuffles (the seeds depend only on the chunk), so the differences between options carry
+    # less noise than their EVs do.
+    def __init__(self, setup, workers=None, policy=basic_strategy):
+        self.setup = setup
+        self.policy = policy
+        self.workers = workers or os.cpu_count()
+        self.snapshot = ShoeSnapshot.for_setup(setup)
+        self.executor = ProcessPoolExecutor(self.workers, initializer=attach_snapshot, initargs=(self.snapshot.handle(),))
+
+    def evaluate(self, deck, playerCards, dealerCards, options, trials=2000, seed=0, replay=False):
+        # dealerCards are the hole card then the upcard. With replay=True each option is played once on the real
+        # order of the shoe; otherwise the hole card and the rest of the shoe are dealt at random trials times.
+        if replay and not has_order(deck):
+            raise ValueError("A shuffling machine or a composition shoe has no dealing order to replay")
+        hole, upcard = dealerCards
+        self.snapshot.write(deck, () if replay else (hole,))
+        playerCodes = [Deck.cardCodes[card] for card in playerCards]
+        holeCode = Deck.cardCodes[hole] if replay else None
+        chunks = 1 if replay else min(self.workers, trials)
+        sizes = [1] if replay else [trials // chunks + (chunk < trials % chunks) for chunk in range(chunks)]
+        futures = [self.executor.submit(play_alternative, self.setup, action, playerCodes, Deck.cardCodes[upcard], holeCode,
+                                        size, seed + chunk, self.policy)
+                   for action in options for chunk, size in enumerate(sizes)]
+        results = {action: RunningStats() for action in options}
+        for future in futures:
+            action, stats = future.result()
+            results[action].merge(stats)
+        return results
+
+    def close(self):
+        self.executor.shutdown()
+        self.snapshot.close()
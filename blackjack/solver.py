@@ -0,0 +1,205 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from .core import Deck
+
+# Compositions are tuples of ten counts indexed by card value - 1 (Ace = 1, ten-value cards = 10).
+# The dealer's final-total probabilities are taken from the shoe left after the player's first two cards
+# and the upcard (the usual "CDZ-" approximation), while the player's own draws are removed exactly.
+DEALER_TOTALS = (17, 18, 19, 20, 21)
+BUST = 5
+HIT = 0
+ACTIONS = ('stand', 'hit', 'double', 'split', 'surrender')
+ACTION_CODES = {'stand': 'S', 'hit': 'H', 'double': 'D', 'split': 'P', 'surrender': 'R'}
+UPCARDS = (2, 3, 4, 5, 6, 7, 8, 9, 10, 1)
+
+def shoe_counts(numDecks):
+    return tuple([4 * numDecks] * 9 + [16 * numDecks])
+
+def card_value(card):
+    return 1 if card.rank == 'Ace' else Deck.values[card.rank]
+
+def remove_card(counts, value):
+    return counts[:value - 1] + (counts[value - 1] - 1,) + counts[value:]
+
+def hand_value(total, hasAce):
+    return total + 10 if hasAce and total + 10 <= 21 else total
+
+class EVSolver:
+    def __init__(self, setup, memo=None):
+        self.setup = setup
+        self.memo = {} if memo is None else memo  # Player hit EVs, keyed by tuples of ints
+        self.dealer_cache = {}
+
+    def dealer_probabilities(self, counts, upcard):
+        key = (counts, upcard)
+        probabilities = self.dealer_cache.get(key)
+        if probabilities is None:
+            probabilities = self.dealer_outcomes(counts, upcard, upcard == 1, 1)
+            self.dealer_cache[key] = probabilities
+        return probabilities
+
+    def dealer_outcomes(self, counts, total, hasAce, numCards):
+        value = hand_value(total, hasAce)
+        if value > 21:
+            return (0, 0, 0, 0, 0, 1)
+        soft = hasAce and value != total
+        if value > 17 or (value == 17 and (not soft or self.setup.dealerStandOnSoft17)):
+            outcome = [0] * 6
+            outcome[value - 17] = 1
+            return tuple(outcome)
+        key = (counts, total, hasAce, numCards == 1)
+        cached = self.dealer_cache.get(key)
+        if cached is not None:
+            return cached
+        # The dealer peeks for blackjack, so with a ten or Ace showing the hole card cannot complete one
+        excluded = 0
+        if numCards == 1 and total == 1:
+            excluded = 10
+        elif numCards == 1 and total == 10:
+            excluded = 1
+        cardsLeft = sum(counts) - (counts[excluded - 1] if excluded else 0)
+        result = [0] * 6
+        for value in range(1, 11):
+            count = counts[value - 1]
+            if not count or value == excluded:
+                continue
+            outcome = self.dealer_outcomes(remove_card(counts, value), total + value, hasAce or value == 1, numCards + 1)
+            weight = count / cardsLeft
+            for i in range(6):
+                result[i] += weight * outcome[i]
+        result = tuple(result)
+        self.dealer_cache[key] = result
+        return result
+
+    def stand_ev(self, value, dealer):
+        if value > 21:
+            return -1
+        ev = dealer[BUST]
+        for dealerTotal, probability in zip(DEALER_TOTALS, dealer):
+            if value > dealerTotal:
+                ev += probability
+            elif value < dealerTotal:
+                ev -= probability
+        return ev
+
+    def best_ev(self, counts, total, hasAce, dealer, context):
+        value = hand_value(total, hasAce)
+        if value >= 21:
+            return self.stand_ev(value, dealer)
+        return max(self.stand_ev(value, dealer), self.hit_ev(counts, total, hasAce, dealer, context))
+
+    def hit_ev(self, counts, total, hasAce, dealer, context):
+        key = context + counts + (total, int(hasAce))
+        ev = self.memo.get(key)
+        if ev is None:
+            ev = 0
+            cardsLeft = sum(counts)
+            for value in range(1, 11):
+                count = counts[value - 1]
+                if count:
+                    ev += count / cardsLeft * self.best_ev(remove_card(counts, value), total + value, hasAce or value == 1, dealer, context)
+            self.memo[key] = ev
+        return ev
+
+    def double_ev(self, counts, total, hasAce, dealer):
+        ev = 0
+        cardsLeft = sum(counts)
+        for value in range(1, 11):
+            count = counts[value - 1]
+            if count:
+                ev += count / cardsLeft * self.stand_ev(hand_value(total + value, hasAce or value == 1), dealer)
+        return 2 * ev
+
+    def split_ev(self, counts, pairValue, dealer, context):
+        ev = 0
+        cardsLeft = sum(counts)
+        for value in range(1, 11):
+            count = counts[value - 1]
+            if not count:
+                continue
+            remaining = remove_card(counts, value)
+            total = pairValue + value
+            hasAce = pairValue == 1 or value == 1
+            if pairValue == 1:
+                handEv = self.stand_ev(hand_value(total, hasAce), dealer)
+            else:
+                handEv = max(self.best_ev(remaining, total, hasAce, dealer, context),
+                             self.double_ev(remaining, total, hasAce, dealer))
+            ev += count / cardsLeft * handEv
+        return 2 * ev
+
+    def action_evs(self, playerValues, upcard, counts=None, anyHand=False):
+        # anyHand also prices a double or surrender that the rules only offer on the first two cards, as the GUI
+        # lets the player take them after hitting too
+        if counts is None:
+            counts = shoe_counts(self.setup.playerChooseNumDecks)
+        for value in list(playerValues[:2]) + [upcard]:
+            counts = remove_card(counts, value)
+        dealer = self.dealer_probabilities(counts, upcard)
+        context = (HIT, upcard) + counts
+        # Later cards come out of the same context, so a hand that has been hit reuses the hit EVs of its first two cards
+        for value in playerValues[2:]:
+            counts = remove_card(counts, value)
+        total = sum(playerValues)
+        hasAce = 1 in playerValues
+        evs = {
+            'stand': self.stand_ev(hand_value(total, hasAce), dealer),
+            'hit': self.hit_ev(counts, total, hasAce, dealer, context),
+        }
+        if len(playerValues) == 2 or anyHand:
+            evs['double'] = self.double_ev(counts, total, hasAce, dealer)
+        if len(playerValues) == 2 and playerValues[0] == playerValues[1]:
+            evs['split'] = self.split_ev(counts, playerValues[0], dealer, context)
+        if len(playerValues) == 2 and self.setup.playWithSurrender or anyHand:
+            evs['surrender'] = -0.5
+        return evs
+
+    def best_action(self, playerValues, upcard, counts=None):
+        evs = self.action_evs(playerValues, upcard, counts)
+        return max(evs, key=evs.get), evs
+
+def strategy_rows():
+    rows = []
+    for total in range(5, 18):
+        low = 2 if total <= 11 else total - 10
+        rows.append((f"Hard {total}", (low, total - low) if low != total - low else (low - 1, total - low + 1)))
+    for other in range(2, 10):
+        rows.append((f"Soft {11 + other}", (1, other)))
+    for value in (2, 3, 4, 5, 6, 7, 8, 9, 10, 1):
+        name = 'A' if value == 1 else str(value)
+        rows.append((f"Pair {name},{name}", (value, value)))
+    return rows
+
+def strategy_table(setup, solver=None, job=None):
+    solver = solver or EVSolver(setup)
+    rows = strategy_rows()
+    table = []
+    for i, (label, playerValues) in enumerate(rows):
+        if job and job.cancelled:
+            break
+        codes = ''.join(ACTION_CODES[solver.best_action(playerValues, upcard)[0]] for upcard in UPCARDS)
+        table.append((label, codes))
+        if job:
+            job.report_progress((i + 1) / len(rows))
+    return table
+
+def solve_row(setup, label, playerValues):
+    solver = EVSolver(setup)
+    return label, ''.join(ACTION_CODES[solver.best_action(playerValues, upcard)[0]] for upcard in UPCARDS)
+
+def parallel_strategy_table(setup, workers=None):
+    # strategy_table with a row per task on a process pool. Every subproblem of a row depends on the shoe left
+    # after its first two cards, which no other row leaves, so a row is solved with its own memos and the only
+    # subproblems worth sharing (dealer hands that reach the same cards from different upcards) stay in one task.
+    rows = strategy_rows()
+    with ProcessPoolExecutor(workers) as pool:
+        # Pairs and the highest hard totals take longest, so they go first
+        futures = [pool.submit(solve_row, setup, label, playerValues) for label, playerValues in reversed(rows)]
+        results = dict(future.result() for future in futures)
+    return [(label, results[label]) for label, _ in rows]
+
+def format_strategy_table(table):
+    lines = ["".ljust(11) + " ".join(['2', '3', '4', '5', '6', '7', '8', '9', 'T', 'A'])]
+    for label, codes in table:
+        lines.append(label.ljust(11) + " ".join(codes))
+    return "\n".join(lines)
@@ -0,0 +1,236 @@
+import math
+
+# Every accumulator here uses a fixed amount of memory however many values it sees, and merge() combines
+# accumulators built from different chunks or workers into the one a single pass would have produced.
+
+class RunningStats:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences from the mean (Welford)
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other):
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stderr(self):
+        return math.sqrt(self.variance / self.count) if self.count else 0.0
+
+class Histogram:
+    def __init__(self, low, high, bins):
+        self.low = low
+        self.high = high
+        self.width = (high - low) / bins
+        self.counts = [0] * bins
+        self.underflow = 0
+        self.overflow = 0
+
+    def add(self, value, count=1):
+        if value < self.low:
+            self.underflow += count
+        elif value >= self.high:
+            self.overflow += count
+        else:
+            self.counts[int((value - self.low) / self.width)] += count
+
+    def merge(self, other):
+        if (self.low, self.high, len(self.counts)) != (other.low, other.high, len(other.counts)):
+            raise ValueError("Histograms with different bins cannot be merged")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+        return self
+
+    def bins(self):
+        return [(self.low + i * self.width, self.low + (i + 1) * self.width, count) for i, count in enumerate(self.counts)]
+
+class QuantileSketch:
+    # Log-spaced buckets (as in DDSketch): any quantile is returned within relativeAccuracy of the true value,
+    # and merging only adds bucket counts, so it is identical to inserting every value into one sketch
+    def __init__(self, relativeAccuracy=0.01, maxBuckets=2048):
+        self.relativeAccuracy = relativeAccuracy
+        self.gamma = (1 + relativeAccuracy) / (1 - relativeAccuracy)
+        self.logGamma = math.log(self.gamma)
+        self.maxBuckets = maxBuckets
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+        self.recent = {}  # Bucket indexes of recently seen magnitudes; round results repeat the same few values
+
+    def bucket(self, magnitude):
+        index = self.recent.get(magnitude)
+        if index is None:
+            index = math.ceil(math.log(magnitude) / self.logGamma)
+            if len(self.recent) >= 256:
+                self.recent.clear()
+            self.recent[magnitude] = index
+        return index
+
+    def add(self, value, count=1):
+        self.count += count
+        if value > 0:
+            index = self.bucket(value)
+            self.positive[index] = self.positive.get(index, 0) + count
+            if len(self.positive) > self.maxBuckets:
+                self.collapse(self.positive)
+        elif value < 0:
+            index = self.bucket(-value)
+            self.negative[index] = self.negative.get(index, 0) + count
+            if len(self.negative) > self.maxBuckets:
+                self.collapse(self.negative)
+        else:
+            self.zeros += count
+
+    def collapse(self, buckets):
+        # Fold the smallest magnitudes together; only values closest to zero lose accuracy
+        indexes = sorted(buckets)
+        excess = len(indexes) - self.maxBuckets
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            buckets[target] += buckets.pop(index)
+
+    def merge(self, other):
+        if self.gamma != other.gamma:
+            raise ValueError("Sketches with different accuracy cannot be merged")
+        for buckets, others in ((self.positive, other.positive), (self.negative, other.negative)):
+            for index, count in others.items():
+                buckets[index] = buckets.get(index, 0) + count
+            if len(buckets) > self.maxBuckets:
+                self.collapse(buckets)
+        self.zeros += other.zeros
+        self.count += other.count
+        return self
+
+    def value(self, index):
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def quantile(self, q):
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self.value(index)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self.value(index)
+        return self.value(max(self.positive))
+
+class BankrollTrajectory:
+    # Merging assumes the other trajectory was played after this one
+    def __init__(self):
+        self.final = 0.0
+        self.peak = 0.0
+        self.trough = 0.0
+        self.maxDrawdown = 0.0
+
+    def add(self, net):
+        self.final += net
+        if self.final > self.peak:
+            self.peak = self.final
+        elif self.final < self.trough:
+            self.trough = self.final
+        if self.peak - self.final > self.maxDrawdown:
+            self.maxDrawdown = self.peak - self.final
+
+    def merge(self, other):
+        self.maxDrawdown = max(self.maxDrawdown, other.maxDrawdown, self.peak - (self.final + other.trough))
+        self.peak = max(self.peak, self.final + other.peak)
+        self.trough = min(self.trough, self.final + other.trough)
+        self.final += other.final
+        return self
+
+OUTCOMES = ('blackjack', 'win', 'push', 'loss', 'surrender')
+
+class SimulationStats:
+    def __init__(self):
+        self.net = RunningStats()
+        self.wagered = 0.0
+        self.netHistogram = Histogram(-8.25, 8.25, 33)  # Half-unit bins covering four doubled split hands
+        self.netSketch = QuantileSketch()
+        self.outcomes = dict.fromkeys(OUTCOMES, 0)
+        self.bankroll = BankrollTrajectory()
+        self.hands = 0  # Filled in by whoever plays the rounds, as a RoundResult does not carry them
+        self.shuffles = 0
+        self.workers = {}  # Rounds played by each process id
+
+    @property
+    def rounds(self):
+        return self.net.count
+
+    def add(self, result):
+        self.net.add(result.net)
+        self.wagered += result.bet
+        self.netHistogram.add(result.net)
+        self.netSketch.add(result.net)
+        # Counted per hand, so a split that wins one hand and loses the other is a win and a loss
+        outcomes = self.outcomes
+        if result.action == 'surrender':
+            outcomes['surrender'] += 1
+        elif result.action == 'blackjack' and result.handsWon:
+            outcomes['blackjack'] += 1
+        else:
+            outcomes['win'] += result.handsWon
+            outcomes['push'] += result.handsPushed
+            outcomes['loss'] += result.handsLost
+        self.bankroll.add(result.net)
+
+    def merge(self, other):
+        self.net.merge(other.net)
+        self.wagered += other.wagered
+        self.netHistogram.merge(other.netHistogram)
+        self.netSketch.merge(other.netSketch)
+        for outcome, count in other.outcomes.items():
+            self.outcomes[outcome] += count
+        self.bankroll.merge(other.bankroll)
+        self.hands += other.hands
+        self.shuffles += other.shuffles
+        for worker, rounds in other.workers.items():
+            self.workers[worker] = self.workers.get(worker, 0) + rounds
+        return self
+
+    def summary(self):
+        return {
+            'rounds': self.net.count,
+            'net': self.net.total,
+            'ev': self.net.mean,
+            'stderr': self.net.stderr,
+            'wagered': self.wagered,
+            'outcomes': dict(self.outcomes),
+            'max_drawdown': self.bankroll.maxDrawdown,
+        }
@@ -0,0 +1,165 @@
+import json
+import math
+import mmap
+import os
+import shutil
+import sys
+from array import array
+from itertools import compress
+
+# One file per field per chunk. The single-byte columns can be filtered with bytes.translate and combined as
+# big integers, so slicing by upcard, starting total, action or count bucket runs at C speed over the mapped files.
+FIELDS = (
+    ('upcard', 'B'),  # Dealer upcard value, Ace = 11
+    ('playerTotal', 'B'),  # Player's starting two-card total
+    ('action', 'B'),  # First action taken, see ACTIONS
+    ('count', 'b'),  # Hi-Lo true count at the deal, rounded down and clamped to a signed byte
+    ('bet', 'd'),  # Total amount wagered on the round
+    ('net', 'd'),
+)
+TYPECODES = dict(FIELDS)
+ACTIONS = ('blackjack', 'stand', 'hit', 'double', 'split', 'surrender')
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+
+def count_bucket(trueCount):
+    return max(-128, min(127, math.floor(trueCount)))
+
+class ColumnWriter:
+    def __init__(self, path, chunkRounds=1000000):
+        self.path = path
+        self.chunkRounds = chunkRounds
+        os.makedirs(path, exist_ok=True)
+        schemaPath = os.path.join(path, 'schema.json')
+        if not os.path.exists(schemaPath):
+            with open(schemaPath, 'w') as f:
+                json.dump({'fields': FIELDS, 'actions': ACTIONS, 'byteorder': sys.byteorder}, f)
+        self.chunk = len(chunk_names(path))
+        self.columns = {name: array(code) for name, code in FIELDS}
+
+    def add(self, result):
+        columns = self.columns
+        columns['upcard'].append(result.upcard)
+        columns['playerTotal'].append(result.playerTotal)
+        columns['action'].append(ACTION_CODES[result.action])
+        columns['count'].append(count_bucket(result.count))
+        columns['bet'].append(result.bet)
+        columns['net'].append(result.net)
+        if len(columns['net']) >= self.chunkRounds:
+            self.flush()
+
+    def flush(self):
+        if not len(self.columns['net']):
+            return
+        # Write into a temporary directory and rename it, so readers never see a half written chunk
+        final = os.path.join(self.path, f"chunk_{self.chunk:06d}")
+        temporary = final + '.tmp'
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(temporary)
+        for name, column in self.columns.items():
+            with open(os.path.join(temporary, name + '.col'), 'wb') as f:
+                column.tofile(f)
+        os.replace(temporary, final)
+        self.chunk += 1
+        self.columns = {name: array(code) for name, code in FIELDS}
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def chunk_names(path):
+    return sorted(name for name in os.listdir(path) if name.startswith('chunk_') and not name.endswith('.tmp'))
+
+class Chunk:
+    def __init__(self, path):
+        self.path = path
+        self.maps = {}
+
+    def raw(self, name):
+        if name not in self.maps:
+            with open(os.path.join(self.path, name + '.col'), 'rb') as f:
+                self.maps[name] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.maps[name]
+
+    def column(self, name):
+        return memoryview(self.raw(name)).cast(TYPECODES[name])
+
+    def __len__(self):
+        return len(self.raw('upcard'))
+
+    def mask(self, filters):
+        # filters maps a byte column to the set of values to keep; the result has a 1 byte for every matching row
+        rows = len(self)
+        combined = None
+        for name, keep in filters.items():
+            table = bytes(1 if (value if TYPECODES[name] == 'B' or value < 128 else value - 256) in keep else 0 for value in range(256))
+            bits = int.from_bytes(self.raw(name)[:].translate(table), 'little')
+            combined = bits if combined is None else combined & bits
+        if combined is None:
+            return None
+        return combined.to_bytes(rows, 'little')
+
+    def close(self):
+        for mapped in self.maps.values():
+            mapped.close()
+        self.maps = {}
+
+class ColumnStore:
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'schema.json')) as f:
+            schema = json.load(f)
+        if schema['byteorder'] != sys.byteorder:
+            raise ValueError("The store was written on a machine with a different byte order")
+        self.chunks = [Chunk(os.path.join(path, name)) for name in chunk_names(path)]
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self.chunks)
+
+    def filters(self, upcard=None, playerTotal=None, action=None, minCount=None, maxCount=None):
+        filters = {}
+        if upcard is not None:
+            filters['upcard'] = {upcard}
+        if playerTotal is not None:
+            filters['playerTotal'] = {playerTotal}
+        if action is not None:
+            filters['action'] = {ACTION_CODES[action]}
+        if minCount is not None or maxCount is not None:
+            low = -128 if minCount is None else minCount
+            high = 127 if maxCount is None else maxCount
+            filters['count'] = set(range(low, high + 1))
+        return filters
+
+    def values(self, name, **criteria):
+        filters = self.filters(**criteria)
+        for chunk in self.chunks:
+            column = chunk.column(name)
+            mask = chunk.mask(filters)
+            yield from (column if mask is None else compress(column, mask))
+
+    def summary(self, **criteria):
+        # Rounds, total wagered and net result for each first action among the matching rounds
+        criteria.pop('action', None)
+        filters = self.filters(**criteria)
+        totals = {}
+        for chunk in self.chunks:
+            bets = chunk.column('bet')
+            nets = chunk.column('net')
+            for action, code in ACTION_CODES.items():
+                mask = chunk.mask({**filters, 'action': {code}})
+                rounds = mask.count(1)
+                if rounds:
+                    entry = totals.setdefault(action, [0, 0.0, 0.0])
+                    entry[0] += rounds
+                    entry[1] += math.fsum(compress(bets, mask))
+                    entry[2] += math.fsum(compress(nets, mask))
+        return {action: {'rounds': rounds, 'wagered': wagered, 'net': net, 'ev': net / rounds}
+                for action, (rounds, wagered, net) in totals.items()}
+
+    def close(self):
+        for chunk in self.chunks:
+            chunk.close()
@@ -0,0 +1,61 @@
+from .core import Deck
+
+# Basic strategy for 4-8 decks, dealer stands on soft 17, double after split allowed.
+# Each row is indexed by the dealer upcard: 2, 3, 4, 5, 6, 7, 8, 9, 10, Ace.
+# H = hit, S = stand, D = double (else hit), d = double (else stand), R = surrender (else hit), P = split
+HARD_STRATEGY = {
+    8: 'HHHHHHHHHH',
+    9: 'HDDDDHHHHH',
+    10: 'DDDDDDDDHH',
+    11: 'DDDDDDDDDH',
+    12: 'HHSSSHHHHH',
+    13: 'SSSSSHHHHH',
+    14: 'SSSSSHHHHH',
+    15: 'SSSSSHHHRH',
+    16: 'SSSSSHHRRR',
+    17: 'SSSSSSSSSS',
+}
+SOFT_STRATEGY = {
+    12: 'HHHHHHHHHH',
+    13: 'HHHDDHHHHH',
+    14: 'HHHDDHHHHH',
+    15: 'HHDDDHHHHH',
+    16: 'HHDDDHHHHH',
+    17: 'HDDDDHHHHH',
+    18: 'SddddSSHHH',
+}
+PAIR_STRATEGY = {
+    2: 'PPPPPPHHHH',
+    3: 'PPPPPPHHHH',
+    4: 'HHHPPHHHHH',
+    5: 'HHHHHHHHHH',
+    6: 'PPPPPHHHHH',
+    7: 'PPPPPPHHHH',
+    8: 'PPPPPPPPPP',
+    9: 'PPPPPSPPSS',
+    10: 'SSSSSSSSSS',
+    11: 'PPPPPPPPPP',
+}
+
+def basic_strategy(hand, upcard, options):
+    column = Deck.values[upcard.rank] - 2
+    if 'split' in options and PAIR_STRATEGY[Deck.values[hand.hand[0].rank]][column] == 'P':
+        return 'split'
+    value = hand.get_value()
+    if hand.is_soft():
+        code = SOFT_STRATEGY.get(value, 'SSSSSSSSSS')[column]
+    else:
+        code = HARD_STRATEGY[min(max(value, 8), 17)][column]
+    if code == 'R':
+        return 'surrender' if 'surrender' in options else 'hit'
+    if code == 'D':
+        return 'double' if 'double' in options else 'hit'
+    if code == 'd':
+        return 'double' if 'double' in options else 'stand'
+    return 'hit' if code == 'H' else 'stand'
+
+def mimic_dealer(hand, upcard, options):
+    # Hits below 17 and stands otherwise, as the dealer does, whatever the upcard
+    return 'hit' if hand.get_value() < 17 else 'stand'
+
+POLICIES = {'basic': basic_strategy, 'mimic': mimic_dealer}
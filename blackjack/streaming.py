@@ -0,0 +1,45 @@
+import json
+import time
+
+from .strategy import basic_strategy
+from .simulation import iter_rounds
+from .stats import SimulationStats
+
+def write_records(results, out):
+    # Each record is written before the next round is played, so a slow reader slows the simulation down
+    # instead of rounds piling up in memory
+    for number, result in enumerate(results, 1):
+        out.write(json.dumps({'round': number, **result._asdict()}) + "\n")
+        yield result
+
+def chunk_summaries(results, chunkSize):
+    stats = SimulationStats()
+    chunk = SimulationStats()
+    chunkStart = start = time.perf_counter()
+    for result in results:
+        chunk.add(result)
+        if chunk.rounds == chunkSize:
+            yield summarize(stats, chunk, chunkStart, start)
+            chunk = SimulationStats()
+            chunkStart = time.perf_counter()
+    if chunk.rounds:
+        yield summarize(stats, chunk, chunkStart, start)
+
+def summarize(stats, chunk, chunkStart, start):
+    now = time.perf_counter()
+    chunkRounds = chunk.rounds
+    stats.merge(chunk)
+    summary = stats.summary()
+    summary['rounds_per_second'] = chunkRounds / (now - chunkStart)
+    summary['elapsed'] = now - start
+    return summary
+
+def stream_simulation(setup, rounds, out, chunkSize=100000, seed=None, policy=basic_strategy, records=None):
+    results = iter_rounds(setup, rounds, seed, policy)
+    if records is not None:
+        results = write_records(results, records)
+    for summary in chunk_summaries(results, chunkSize):
+        out.write(json.dumps(summary) + "\n")
+        out.flush()
+        if records is not None:
+            records.flush()
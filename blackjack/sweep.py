@@ -0,0 +1,75 @@
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .core import GameSetup
+from .simulation import run_simulation
+
+SHUFFLE_COST = 0.02  # Rebuilding and shuffling one card costs about this fraction of playing one round
+CSM_COST = 0.4  # Feeding a round's discards through the shuffling machine, relative to playing the round
+
+def sweep_configurations(ranges):
+    names = [name for name in GameSetup.ruleNames if name in ranges]
+    defaults = GameSetup().rules()
+    configurations = []
+    for values in itertools.product(*(ranges[name] for name in names)):
+        rules = dict(defaults)
+        rules.update(zip(names, values))
+        configurations.append(rules)
+    return configurations
+
+def configuration_key(rules, rounds, seed):
+    return json.dumps([rules, rounds, seed], sort_keys=True)
+
+def estimated_cost(rules, rounds):
+    if rules['autoReshuffle']:
+        return rounds * (1 + CSM_COST)
+    cards = rules['playerChooseNumDecks'] * 52
+    roundsPerShuffle = max(1, cards * rules['deckPenetration'] / 5.4)
+    return rounds * (1 + SHUFFLE_COST * cards / roundsPerShuffle)
+
+def run_configuration(rules, rounds, seed):
+    stats = run_simulation(GameSetup.from_rules(rules), rounds, seed)
+    return rules, stats.summary()
+
+def load_completed(path):
+    completed = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by an interrupted run is simply redone
+                completed[configuration_key(row['rules'], row['target_rounds'], row['seed'])] = row
+    return completed
+
+def run_sweep(ranges, rounds, output, seed=1, workers=None, progress=None):
+    completed = load_completed(output)
+    pending = [rules for rules in sweep_configurations(ranges) if configuration_key(rules, rounds, seed) not in completed]
+    # Longest jobs first, so one big configuration submitted last does not leave the other workers idle
+    pending.sort(key=lambda rules: estimated_cost(rules, rounds), reverse=True)
+    with open(output, 'a') as f, ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(run_configuration, rules, rounds, seed) for rules in pending]
+        for future in as_completed(futures):
+            rules, summary = future.result()
+            row = {'rules': rules, 'target_rounds': rounds, 'seed': seed, **summary}
+            f.write(json.dumps(row) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+            completed[configuration_key(rules, rounds, seed)] = row
+            if progress:
+                progress(row)
+    return [completed[configuration_key(rules, rounds, seed)] for rules in sweep_configurations(ranges)]
+
+def format_sweep_table(rows, confidence=1.96):
+    header = f"{'Decks':>5} {'Pen':>5} {'S17':>4} {'Sur':>4} {'Ins':>4} {'Payout':>7} {'CSM':>4} {'House edge':>11} {'95% CI':>10} {'Rounds':>10}"
+    lines = [header]
+    for row in rows:
+        rules = row['rules']
+        flags = ['yes' if rules[name] else 'no' for name in ('dealerStandOnSoft17', 'playWithSurrender', 'playWithInsurance')]
+        lines.append(f"{rules['playerChooseNumDecks']:>5} {rules['deckPenetration']:>5.2f} {flags[0]:>4} {flags[1]:>4} {flags[2]:>4} "
+                     f"{rules['payoutOdds']:>7.2f} {'yes' if rules['autoReshuffle'] else 'no':>4} "
+                     f"{-row['ev'] * 100:>+10.3f}% {confidence * row['stderr'] * 100:>9.3f}% {row['rounds']:>10}")
+    return "\n".join(lines)
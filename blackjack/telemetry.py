@@ -0,0 +1,112 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Telemetry:
+    # Metrics for a long run, served as Prometheus text from a small local HTTP server. Runs publish into it once
+    # per finished chunk of rounds, from the merged stats the workers send back anyway, so nothing is counted per
+    # round and watching a run costs no measurable throughput. A value may also be a function, read at scrape time.
+    def __init__(self, prefix='blackjack'):
+        self.prefix = prefix
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.metrics = {}  # name -> (kind, help, {labels: value})
+        self.server = None
+        self.describe('uptime_seconds', 'gauge', "Seconds since the run started")
+        self.set('uptime_seconds', lambda: time.monotonic() - self.started)
+
+    def describe(self, name, kind, text):
+        with self.lock:
+            self.metrics.setdefault(name, (kind, text, {}))
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.metrics[name][2][tuple(sorted(labels.items()))] = value
+
+    def add(self, name, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            samples = self.metrics[name][2]
+            samples[key] = samples.get(key, 0) + value
+
+    def render(self):
+        lines = []
+        with self.lock:
+            metrics = [(name, kind, text, list(samples.items())) for name, (kind, text, samples) in sorted(self.metrics.items())]
+        for name, kind, text, samples in metrics:
+            fullName = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {fullName} {text}")
+            lines.append(f"# TYPE {fullName} {kind}")
+            for labels, value in samples:
+                if callable(value):
+                    value = value()
+                labelText = ','.join(f'{label}="{labelValue}"' for label, labelValue in labels)
+                lines.append(f"{fullName}{{{labelText}}} {value}" if labels else f"{fullName} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9100, host='127.0.0.1'):
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = telemetry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # A scrape every few seconds would bury the run's own output
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name='telemetry', daemon=True).start()
+        return self.server.server_address[1]
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+class RunMonitor:
+    # The progress hook of simulate_tables and simulate_to_precision. target is the number of rounds the run
+    # will play, or a function estimating it from the stats so far, and gives the progress and ETA.
+    def __init__(self, telemetry, target=None):
+        self.telemetry = telemetry
+        self.target = target
+        for name, kind, text in (
+            ('rounds_total', 'counter', "Rounds played"),
+            ('hands_total', 'counter', "Player hands played, counting split hands"),
+            ('shuffles_total', 'counter', "Shoes shuffled"),
+            ('rounds_per_second', 'gauge', "Rounds played per second since the start"),
+            ('hands_per_second', 'gauge', "Player hands played per second since the start"),
+            ('chunks_pending', 'gauge', "Chunks of rounds handed to workers and not yet merged"),
+            ('worker_rounds_total', 'counter', "Rounds played by each worker process"),
+            ('progress_ratio', 'gauge', "Fraction of the run done"),
+            ('eta_seconds', 'gauge', "Estimated seconds until the run finishes"),
+            ('player_edge', 'gauge', "Player edge per initial bet so far"),
+            ('player_edge_stderr', 'gauge', "Standard error of the player edge so far"),
+        ):
+            telemetry.describe(name, kind, text)
+
+    def __call__(self, stats, pending):
+        telemetry = self.telemetry
+        elapsed = max(time.monotonic() - telemetry.started, 1e-9)
+        rate = stats.rounds / elapsed
+        telemetry.set('rounds_total', stats.rounds)
+        telemetry.set('hands_total', stats.hands)
+        telemetry.set('shuffles_total', stats.shuffles)
+        telemetry.set('rounds_per_second', rate)
+        telemetry.set('hands_per_second', stats.hands / elapsed)
+        telemetry.set('chunks_pending', pending)
+        for worker, rounds in stats.workers.items():
+            telemetry.set('worker_rounds_total', rounds, worker=worker)
+        telemetry.set('player_edge', stats.net.mean)
+        telemetry.set('player_edge_stderr', stats.net.stderr)
+        target = self.target(stats) if callable(self.target) else self.target
+        if target:
+            telemetry.set('progress_ratio', min(1.0, stats.rounds / target))
+            telemetry.set('eta_seconds', max(0, target - stats.rounds) / rate if rate else 0)
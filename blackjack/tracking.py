@@ -0,0 +1,221 @@
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import accumulate
+
+from .core import Deck
+from .seeds import derive_seed
+from .stats import RunningStats
+
+HI_LO = [Deck.countValues[card.rank] for card in Deck.codeCards]  # By card code
+EDGE_PER_TRUE_COUNT = 0.005  # Each Hi-Lo true count point is worth about half a percent of player edge
+CARDS_PER_ROUND = 5.4
+
+# A shoe after a non-random shuffle is a list of runs (start, length): each run is cards start to start + length - 1
+# of the stack the dealer picked up, in the same order, and the runs follow each other in dealing order. Every
+# step of the shuffle only cuts and reorders runs, so a shoe costs a few hundred tuples however many decks it
+# holds, and where a stretch of the old stack ends up is read off the runs without following any single card.
+
+def split_runs(runs, count):
+    # The first count cards of runs and the rest
+    for index, (start, length) in enumerate(runs):
+        if count < length:
+            head = runs[:index] + [(start, count)] if count else runs[:index]
+            return head, [(start + count, length - count)] + runs[index + 1:]
+        count -= length
+    return runs, []
+
+class ShuffleModel:
+    # The shuffle a dealer performs on the stack picked up at the end of a shoe: the discards, last played on
+    # top, over the cards left behind the cut card. Steps are applied in order: 'riffle' splits the stack near
+    # the middle and interleaves the halves in clumps of clump cards on average, 'strip' takes packets of about
+    # strip cards off the top and piles them up in reverse, and 'cut' cuts the stack at a point in cutRange
+    # (where the tracker asks for it when trackerCuts is on and the point is in range).
+    def __init__(self, steps=('riffle', 'strip', 'riffle', 'cut'), clump=3.0, splitNoise=0.05, strip=26, cutRange=(0.2, 0.8),
+                 trackerCuts=True):
+        self.steps = steps
+        self.trackerCuts = trackerCuts
+        self.clump = clump
+        self.splitNoise = splitNoise
+        self.strip = strip
+        self.cutRange = cutRange
+
+    def riffle(self, runs, total, rng):
+        # Clump sizes are geometric with mean clump. The two halves are walked with an index and an offset
+        # into their runs, all in local variables, as this loop is where the time goes.
+        left, right = split_runs(runs, int(total * (0.5 + rng.uniform(-self.splitNoise, self.splitNoise))))
+        packets = (left, right)
+        indexes = [0, 0]
+        offsets = [0, 0]
+        remaining = [total - sum(length for _, length in right), sum(length for _, length in right)]
+        logStay = math.log(1 - 1 / self.clump) if self.clump > 1 else None
+        random = rng.random
+        log = math.log
+        out = []
+        append = out.append
+        side = random() < 0.5
+        while remaining[0] and remaining[1]:
+            count = 1 + int(log(1 - random()) / logStay) if logStay else 1
+            if count > remaining[side]:
+                count = remaining[side]
+            remaining[side] -= count
+            packet = packets[side]
+            index = indexes[side]
+            offset = offsets[side]
+            while count:
+                start, length = packet[index]
+                taken = length - offset
+                if taken > count:
+                    taken = count
+                append((start + offset, taken))
+                offset += taken
+                count -= taken
+                if offset == length:
+                    index += 1
+                    offset = 0
+            indexes[side] = index
+            offsets[side] = offset
+            side = not side
+        for side in (0, 1):
+            if remaining[side]:
+                start, length = packets[side][indexes[side]]
+                append((start + offsets[side], length - offsets[side]))
+                out.extend(packets[side][indexes[side] + 1:])
+        return out
+
+    def strip_cut(self, runs, total, rng):
+        packets = []
+        while runs:
+            packet, runs = split_runs(runs, max(1, int(self.strip * rng.uniform(0.5, 1.5))))
+            packets.append(packet)
+        return [run for packet in reversed(packets) for run in packet]
+
+    def shuffle(self, total, rng, cutAt=None):
+        # The runs of a shuffled stack of total cards. cutAt(runs) gives the tracker's cut point, or None.
+        runs = [(0, total)]
+        for step in self.steps:
+            if step == 'riffle':
+                runs = self.riffle(runs, total, rng)
+            elif step == 'strip':
+                runs = self.strip_cut(runs, total, rng)
+            elif step == 'cut':
+                low, high = (int(total * bound) for bound in self.cutRange)
+                point = cutAt(runs) if cutAt and self.trackerCuts else None
+                if point is None or not low <= point <= high:
+                    point = rng.randint(low, high)
+                head, tail = split_runs(runs, point)
+                runs = tail + head
+            else:
+                raise ValueError(f"unknown shuffle step {step}")
+        return runs
+
+def landing(runs, start, end):
+    # The first and last shoe positions (end exclusive) that cards start to end - 1 of the old stack land on
+    first = last = None
+    position = 0
+    for runStart, length in runs:
+        if runStart < end and start < runStart + length:
+            low = max(start, runStart) - runStart + position
+            high = min(end, runStart + length) - runStart + position
+            first = low if first is None else min(first, low)
+            last = high if last is None else max(last, high)
+        position += length
+    return first, last
+
+def zone_count(runs, prefix, first, last):
+    # The Hi-Lo running count of the shoe positions first to last - 1, summed run by run from the old stack
+    total = 0
+    position = 0
+    for start, length in runs:
+        low = max(first, position)
+        high = min(last, position + length)
+        if low < high:
+            total += prefix[start + high - position] - prefix[start + low - position]
+        position += length
+        if position >= last:
+            break
+    return total
+
+def best_slug(prefix, discards, slugSize):
+    # The stretch of slugSize cards among the discards (the top of the stack) richest in tens and Aces
+    if discards < slugSize:
+        return None
+    start = min(range(discards - slugSize + 1), key=lambda start: prefix[start + slugSize] - prefix[start])
+    return start, start + slugSize
+
+def span_edge(runs, prefix, first, last, dealt, spread, baseEdge):
+    # Edge per unit bet when spread units go on the rounds dealt from shoe positions first to last - 1 and one
+    # unit on the rest, with the rounds in the span worth their Hi-Lo true count. Also returns that true count.
+    last = min(last, dealt)
+    cards = max(0, last - first)
+    trueCount = -zone_count(runs, prefix, first, last) * 52 / cards if cards else 0.0
+    spanRounds = cards / CARDS_PER_ROUND
+    flatRounds = (dealt - cards) / CARDS_PER_ROUND
+    won = spread * spanRounds * (baseEdge + EDGE_PER_TRUE_COUNT * trueCount) + flatRounds * baseEdge
+    return won / (spread * spanRounds + flatRounds), trueCount, cards > 0
+
+def track_stack(stack, discards, dealt, model, rng, slugSize=52, spread=8, baseEdge=-0.005):
+    # One shoe: stack is the Hi-Lo value of every card picked up, discards of them on top, and dealt cards of
+    # the next shoe are played before the cut card. The tracker picks the slug richest in tens and Aces, cuts it
+    # to the front when allowed, and bets spread units while the span the slug landed on is dealt. The control
+    # does the same with a slug picked at random, which no card knowledge goes into, so it comes out at
+    # baseEdge. Returns both edges, the true count of the tracker's span and whether it reached the dealt cards.
+    prefix = list(accumulate(stack, initial=0))
+    slug = best_slug(prefix, discards, slugSize)
+    if slug is None:
+        return baseEdge, baseEdge, 0.0, False
+    start = rng.randint(0, discards - slugSize)
+    results = []
+    for low, high in (slug, (start, start + slugSize)):
+        runs = model.shuffle(len(stack), rng, lambda runs: landing(runs, low, high)[0])
+        first, last = landing(runs, low, high)
+        results.append(span_edge(runs, prefix, first, last, dealt, spread, baseEdge))
+    (edge, trueCount, reached), (control, _, _) = results
+    return edge, control, trueCount, reached
+
+def track_shoes(model, shoes, decks, penetration, seed, slugSize, spread, baseEdge):
+    rng = random.Random(seed)
+    values = [HI_LO[code] for code in range(52)] * decks
+    dealt = int(len(values) * penetration)
+    edges, controls, counts = RunningStats(), RunningStats(), RunningStats()
+    reached = 0
+    for _ in range(shoes):
+        rng.shuffle(values)  # The shoe before: its first dealt cards were played, in dealing order
+        stack = values[dealt - 1::-1] + values[dealt:]
+        edge, control, trueCount, hit = track_stack(stack, dealt, dealt, model, rng, slugSize, spread, baseEdge)
+        edges.add(edge)
+        controls.add(control)
+        counts.add(trueCount)
+        reached += hit
+    return edges, controls, counts, reached
+
+def analyze_tracking(model, shoes, decks=6, penetration=0.75, seed=0, slugSize=52, spread=8, baseEdge=-0.005, workers=1,
+                     chunkShoes=10000):
+    # The edge a shuffle tracker gets against model over many simulated shoes, next to a control tracking random
+    # slugs, which should come out at baseEdge. Chunks are seeded from derive_seed, so the result is the
+    # same for any number of workers.
+    sizes = [min(chunkShoes, shoes - start) for start in range(0, shoes, chunkShoes)]
+    seeds = [derive_seed(seed, 'tracking', chunk) for chunk in range(len(sizes))]
+    arguments = [(model, size, decks, penetration, chunkSeed, slugSize, spread, baseEdge) for size, chunkSeed in zip(sizes, seeds)]
+    if workers == 1:
+        results = [track_shoes(*chunk) for chunk in arguments]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(track_shoes, *zip(*arguments)))
+    edges, controls, counts = RunningStats(), RunningStats(), RunningStats()
+    reached = 0
+    for chunkEdges, chunkControls, chunkCounts, chunkReached in results:
+        edges.merge(chunkEdges)
+        controls.merge(chunkControls)
+        counts.merge(chunkCounts)
+        reached += chunkReached
+    return {
+        'shoes': shoes,
+        'edge': edges.mean,
+        'stderr': edges.stderr,
+        'control_edge': controls.mean,
+        'control_stderr': controls.stderr,
+        'gain': edges.mean - controls.mean,
+        'slug_true_count': counts.mean,
+        'reached': reached / shoes if shoes else 0.0,
+    }
@@ -0,0 +1,82 @@
+import queue
+import threading
+import time
+
+class Job:
+    progressInterval = 0.05  # Seconds between progress messages so the Tk queue is never flooded
+
+    def __init__(self, func, args, results, on_done=None, on_progress=None, on_error=None, on_cancel=None):
+        self.func = func
+        self.args = args
+        self.results = results
+        self.on_done = on_done
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+        self.finished = False
+        self.cancel_event = threading.Event()
+        self.last_report = 0
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report_progress(self, fraction):
+        now = time.perf_counter()
+        if now - self.last_report >= self.progressInterval:
+            self.last_report = now
+            self.results.put(('progress', self, fraction))
+
+class WorkerPool:
+    def __init__(self, root, numWorkers=2, pollInterval=10, pollBudget=0.008):
+        self.root = root
+        self.pollInterval = pollInterval  # Milliseconds between queue polls on the Tk thread
+        self.pollBudget = pollBudget  # Seconds a single poll may spend running callbacks
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.threads = [threading.Thread(target=self.worker_loop, daemon=True) for _ in range(numWorkers)]
+        for thread in self.threads:
+            thread.start()
+        self.poll_id = self.root.after(self.pollInterval, self.poll_results)
+
+    def submit(self, func, *args, on_done=None, on_progress=None, on_error=None, on_cancel=None):
+        job = Job(func, args, self.results, on_done, on_progress, on_error, on_cancel)
+        self.jobs.put(job)
+        return job
+
+    def worker_loop(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            if job.cancelled:
+                self.results.put(('cancelled', job, None))
+                continue
+            try:
+                result = job.func(job, *job.args)
+            except Exception as error:
+                self.results.put(('error', job, error))
+            else:
+                self.results.put(('cancelled' if job.cancelled else 'done', job, result))
+
+    def poll_results(self):
+        deadline = time.perf_counter() + self.pollBudget
+        while time.perf_counter() < deadline:
+            try:
+                kind, job, payload = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind != 'progress':
+                job.finished = True
+            callback = {'progress': job.on_progress, 'done': job.on_done, 'error': job.on_error, 'cancelled': job.on_cancel}[kind]
+            if callback:
+                callback(payload)
+        self.poll_id = self.root.after(self.pollInterval, self.poll_results)
+
+    def shutdown(self):
+        self.root.after_cancel(self.poll_id)
+        for _ in self.threads:
+            self.jobs.put(None)
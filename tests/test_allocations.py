@@ -0,0 +1,30 @@
+import unittest
+
+from blackjack.core import GameSetup
+from blackjack.simulation import allocation_check
+
+# A round still creates its RoundResult and a few ints and floats, about 290 bytes (325 with a shuffling machine)
+# that the next round frees. The bounds leave room for a shuffle growing the six deck shoe's card list back to 312
+# entries, but not for a round building containers again or keeping anything once it is over.
+MAX_ROUND_BYTES = 4096
+MAX_MEAN_BYTES = 336
+MAX_GROWTH_BLOCKS = 4  # The hand pool may still gain a Hand or a longer card list the first time a round splits further
+
+class AllocationTest(unittest.TestCase):
+    def check(self, setup):
+        allocations = allocation_check(setup, 20000, seed=2)
+        self.assertLessEqual(allocations['peak'], MAX_ROUND_BYTES)
+        self.assertLessEqual(allocations['mean'], MAX_MEAN_BYTES)
+        self.assertLessEqual(allocations['growthBlocks'], MAX_GROWTH_BLOCKS, allocations['largest'])
+        self.assertEqual(allocations['collections'], 0)
+
+    def test_shoe(self):
+        self.check(GameSetup())
+
+    def test_shuffling_machine(self):
+        setup = GameSetup()
+        setup.autoReshuffle = True
+        self.check(setup)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import math
+import unittest
+from collections import Counter
+
+from blackjack.core import CompositionDeck, Deck, GameSetup
+from blackjack.simulation import RoundPool, new_deck, play_round, simulate
+from blackjack.strategy import basic_strategy
+
+def composition_setup(infinite=False, csm=False):
+    setup = GameSetup()
+    setup.compositionShoe = not infinite
+    setup.infiniteDeck = infinite
+    setup.autoReshuffle = csm
+    return setup
+
+class CompositionDeckTest(unittest.TestCase):
+    def check_counts(self, deck):
+        counts = dict(zip(Deck.ranks, deck.counts))
+        self.assertEqual(deck.tree.total, sum(deck.counts))
+        self.assertEqual(Counter(card.rank for card in deck.remaining_cards()), Counter({rank: n for rank, n in counts.items() if n}))
+        self.assertEqual(deck.tensRemaining, sum(n for rank, n in counts.items() if Deck.values[rank] == 10))
+        return counts
+
+    def test_counts_follow_the_cards_dealt(self):
+        setup = composition_setup()
+        deck = new_deck(setup, seed=1)
+        pool = RoundPool()
+        for _ in range(500):
+            shuffles = deck.shuffles
+            play_round(setup, deck, basic_strategy, pool=pool)
+            counts = self.check_counts(deck)
+            self.assertEqual(deck.cardsRemaining, sum(counts.values()))
+            if deck.shuffles == shuffles:
+                # The count starts from a full shoe, whose Hi-Lo values add up to nothing
+                self.assertEqual(deck.runningCount, -sum(Deck.countValues[rank] * n for rank, n in counts.items()))
+        self.assertGreater(deck.shuffles, 2)
+
+    def test_shuffling_machine_puts_every_card_back(self):
+        setup = composition_setup(csm=True)
+        deck = new_deck(setup, seed=2)
+        pool = RoundPool()
+        for _ in range(500):
+            play_round(setup, deck, basic_strategy, pool=pool)
+            counts = self.check_counts(deck)
+            held = Counter(Deck.ranks[code >> 2] for code in deck.buffer)
+            self.assertEqual({rank: counts[rank] + held[rank] for rank in Deck.ranks}, dict.fromkeys(Deck.ranks, 4 * setup.playerChooseNumDecks))
+            self.assertEqual(deck.runningCount, -sum(Deck.countValues[rank] * n for rank, n in counts.items()))
+
+    def test_infinite_deck_never_runs_down(self):
+        deck = CompositionDeck(1, infinite=True, seed=3)
+        drawn = Counter(deck.draw_card().rank for _ in range(52000))
+        self.assertEqual(deck.counts, [4] * len(Deck.ranks))
+        self.assertEqual((deck.cardsRemaining, deck.runningCount), (52, 0))
+        for rank in Deck.ranks:
+            self.assertLess(abs(drawn[rank] - 4000), 4 * math.sqrt(4000))
+
+    def test_draws_follow_the_counts(self):
+        deck = CompositionDeck(1, 1.0, seed=4)
+        deck.load_cards([card for card in Deck.codeCards if card.rank in ('2', 'Ace')][:6])  # Four Twos and two Aces
+        drawn = Counter(deck.draw_card().rank for _ in range(6))
+        self.assertEqual(drawn, Counter({'2': 4, 'Ace': 2}))
+        self.assertEqual(deck.counts, [0] * len(Deck.ranks))
+
+    def test_same_edge_as_a_card_shoe(self):
+        cards = simulate(GameSetup(), 40000, seed=5)
+        counts = simulate(composition_setup(), 40000, seed=5)
+        self.assertLess(abs(cards['ev'] - counts['ev']), 3 * math.hypot(cards['stderr'], counts['stderr']))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import random
+import unittest
+from collections import Counter
+
+from blackjack.core import Deck, GameSetup
+from blackjack.csm import ContinuousShuffler, FenwickTree
+from blackjack.simulation import RoundPool, new_deck, play_round
+from blackjack.strategy import basic_strategy
+
+def csm_setup(decks=6, bufferSize=10):
+    setup = GameSetup()
+    setup.playerChooseNumDecks = decks
+    setup.autoReshuffle = True
+    setup.csmBufferSize = bufferSize
+    return setup
+
+class FenwickTreeTest(unittest.TestCase):
+    def test_find_and_add(self):
+        rng = random.Random(1)
+        values = [rng.randrange(5) for _ in range(37)]
+        tree = FenwickTree(values)
+        for _ in range(200):
+            index = rng.randrange(len(values))
+            delta = rng.randrange(-values[index], 4)
+            values[index] += delta
+            tree.add(index, delta)
+            self.assertEqual(tree.total, sum(values))
+            if tree.total:
+                target = rng.randrange(tree.total)
+                # The slot a linear scan lands in
+                running = 0
+                for expected, value in enumerate(values):
+                    running += value
+                    if running > target:
+                        break
+                self.assertEqual(tree.find(target), expected)
+
+class ShufflerTest(unittest.TestCase):
+    def test_keeps_every_card(self):
+        cards = Deck.codeCards * 2
+        machine = ContinuousShuffler(cards, shelves=10, bufferSize=6, rng=random.Random(2))
+        out = []
+        rng = random.Random(3)
+        for _ in range(2000):
+            if out and rng.random() < 0.5:
+                machine.insert([out.pop(rng.randrange(len(out)))])
+            else:
+                card = machine.draw()
+                if card:
+                    out.append(card)
+            self.assertTrue(all(len(shelf) <= machine.shelfSize for shelf in machine.shelves))
+            self.assertEqual(len(machine), sum(1 for _ in machine.cards()))
+            self.assertEqual(Counter(machine.cards()) + Counter(machine.buffer) + Counter(out), Counter(cards))
+
+    def test_shelves_must_hold_the_shoe(self):
+        with self.assertRaises(ValueError):
+            ContinuousShuffler(Deck.codeCards, shelves=4, shelfSize=10)
+
+class ShufflingMachineDeckTest(unittest.TestCase):
+    def check_rounds(self, setup, rounds=300):
+        deck = new_deck(setup, seed=4)
+        pool = RoundPool()
+        full = Counter(Deck.codeCards * setup.playerChooseNumDecks)
+        shuffles = deck.shuffles
+        for _ in range(rounds):
+            play_round(setup, deck, basic_strategy, pool=pool)
+            machine = Counter(deck.remaining_cards())
+            # After a round every card is in the machine or its delay buffer, and the count tracks those held back
+            self.assertEqual(machine + Counter(deck.csm.buffer), full)
+            self.assertEqual(deck.cardsRemaining, sum(machine.values()))
+            self.assertEqual(deck.tensRemaining, sum(count for card, count in machine.items() if Deck.values[card.rank] == 10))
+            self.assertEqual(deck.runningCount, -sum(Deck.countValues[card.rank] * count for card, count in machine.items()))
+        self.assertEqual(deck.shuffles, shuffles)  # The machine never needs the shoe shuffled again
+
+    def test_with_delay_buffer(self):
+        self.check_rounds(csm_setup())
+
+    def test_without_delay_buffer(self):
+        self.check_rounds(csm_setup(decks=1, bufferSize=0))
+
+    def test_seeded_machine_repeats(self):
+        dealt = []
+        for _ in range(2):
+            deck = new_deck(csm_setup(), seed=5)
+            pool = RoundPool()
+            dealt.append([play_round(csm_setup(), deck, basic_strategy, pool=pool) for _ in range(200)])
+        self.assertEqual(dealt[0], dealt[1])
+
+if __name__ == '__main__':
+    unittest.main()
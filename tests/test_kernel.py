@@ -0,0 +1,50 @@
+import unittest
+from array import array
+
+from blackjack.core import Deck, Hand
+from blackjack.kernel import dealer_kernel, finish_hand
+from blackjack.solver import card_value
+
+def reference_dealer(cards, standSoft17):
+    # The dealer rule written out from Hand's own value and softness, drawing cards in order
+    hand = Hand()
+    for card in cards[:2]:
+        hand.add_card(card)
+    drawn = 2
+    while hand.get_value() < 17 or (hand.get_value() == 17 and hand.is_soft() and not standSoft17):
+        hand.add_card(cards[drawn])
+        drawn += 1
+    return min(hand.get_value(), 22), drawn - 2
+
+class DealerKernelTest(unittest.TestCase):
+    def setUp(self):
+        deck = Deck(6, 1.0, seed=7)
+        deck.shuffle_deck()
+        self.cards = deck.cards[::-1]  # Dealing order
+        self.starts = range(len(self.cards) - 20)  # A dealer hand starting at every card of the shoe
+
+    def check(self, standSoft17):
+        expected = [reference_dealer(self.cards[start:start + 20], standSoft17) for start in self.starts]
+        shoe = bytes(card_value(card) for card in self.cards)
+        cursors = array('l', [start + 2 for start in self.starts])
+        totals, consumed = dealer_kernel([shoe[start + 1] for start in self.starts], [shoe[start] for start in self.starts],
+                                         [shoe] * len(self.starts), cursors, standSoft17)
+        self.assertEqual(list(zip(totals, consumed)), expected)
+        self.assertEqual(list(cursors), [start + 2 + drawn for start, (_, drawn) in zip(self.starts, expected)])
+        deck = Deck(6, 1.0)
+        for start, (total, drawn) in zip(self.starts, expected):
+            deck.load_cards(self.cards[start + 2:start + 20][::-1])
+            hand = Hand()
+            hand.add_card(self.cards[start])
+            hand.add_card(self.cards[start + 1])
+            finish_hand(hand, deck, standSoft17)
+            self.assertEqual((min(hand.get_value(), 22), len(hand.hand) - 2), (total, drawn))
+
+    def test_stand_soft_17(self):
+        self.check(True)
+
+    def test_hit_soft_17(self):
+        self.check(False)
+
+if __name__ == '__main__':
+    unittest.main()
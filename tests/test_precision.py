@@ -0,0 +1,44 @@
+import contextlib
+import io
+import unittest
+
+from blackjack.cli import build_parser, check_simulate_args
+from blackjack.core import GameSetup
+from blackjack.simulation import run_table, simulate_to_precision
+
+class PrecisionTest(unittest.TestCase):
+    def test_stops_on_max_rounds_exactly(self):
+        stats, reached = simulate_to_precision(GameSetup(), 1e-6, seed=1, chunkRounds=1000, maxRounds=2500)
+        self.assertFalse(reached)
+        self.assertEqual(stats.rounds, 2500)
+        # The cut chunk is the start of the chunk the run would otherwise have played
+        expected = run_table(GameSetup(), 1000, 1, 0)
+        expected.merge(run_table(GameSetup(), 1000, 1, 1)).merge(run_table(GameSetup(), 500, 1, 2))
+        self.assertEqual(stats.summary(), expected.summary())
+
+    def test_max_rounds_within_one_chunk(self):
+        stats, reached = simulate_to_precision(GameSetup(), 1e-6, seed=1, chunkRounds=1000, maxRounds=300)
+        self.assertEqual((stats.rounds, reached), (300, False))
+
+    def test_workers_stop_on_the_same_round(self):
+        serial, _ = simulate_to_precision(GameSetup(), 1e-6, seed=1, chunkRounds=1000, maxRounds=2500)
+        parallel, _ = simulate_to_precision(GameSetup(), 1e-6, seed=1, chunkRounds=1000, maxRounds=2500, workers=2)
+        self.assertEqual(parallel.summary(), serial.summary())
+
+    def test_target_met(self):
+        stats, reached = simulate_to_precision(GameSetup(), 1.0, seed=1, chunkRounds=1000, maxRounds=10000)
+        self.assertTrue(reached)
+        self.assertEqual(stats.rounds, 2000)  # Never fewer than two chunks
+
+    def check_rejected(self, *argv):
+        args = build_parser().parse_args(['simulate', *argv])
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            check_simulate_args(args)
+
+    def test_options_outside_precision_runs(self):
+        self.check_rejected('--max-rounds', '1000')
+        self.check_rejected('--precision', '0.1', '--rounds', '1000')
+        check_simulate_args(build_parser().parse_args(['simulate', '--precision', '0.1', '--max-rounds', '1000']))
+
+if __name__ == '__main__':
+    unittest.main()
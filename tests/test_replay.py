@@ -0,0 +1,54 @@
+import random
+import unittest
+
+from blackjack.core import GameSetup
+from blackjack.replay import replay, replay_shoe
+from blackjack.simulation import iter_rounds, new_deck
+from blackjack.strategy import basic_strategy
+
+def recorded_shoes(decks, count, seed=1):
+    rng = random.Random(seed)
+    shoes = []
+    for _ in range(count):
+        codes = list(range(52)) * decks
+        rng.shuffle(codes)
+        shoes.append(bytes(codes))
+    return shoes
+
+class ReplayTest(unittest.TestCase):
+    def test_single_deck_rounds_per_shoe(self):
+        # The cut is the game's own, so a replayed shoe plays about as many rounds as the game deals from one
+        setup = GameSetup()
+        setup.playerChooseNumDecks = 1
+        shoes = recorded_shoes(1, 500)
+        replayed = sum(replay_shoe(setup, codes, basic_strategy)[1] for codes in shoes) / len(shoes)
+        deck = new_deck(setup, seed=1)
+        for _ in iter_rounds(setup, 5000, deck=deck):
+            pass
+        dealt = 5000 / deck.shuffles
+        self.assertGreater(replayed, 6.5)
+        self.assertLess(abs(replayed - dealt), 1)
+
+    def test_stops_when_the_recorded_cards_run_out(self):
+        # Dealt to the last card, a shoe only counts the rounds its recorded cards were enough for
+        setup = GameSetup()
+        setup.deckPenetration = 1.0
+        codes = recorded_shoes(1, 1)[0]
+        self.assertEqual(replay_shoe(setup, codes[:3], basic_strategy), (0, 0, 0))
+        played = 0
+        for length in range(4, 53):
+            net, rounds, wagered = replay_shoe(setup, codes[:length], basic_strategy)
+            self.assertLessEqual(rounds * 4, length)
+            self.assertGreaterEqual(rounds, played)
+            self.assertGreaterEqual(wagered, rounds)
+            played = rounds
+        self.assertGreater(played, 0)
+
+    def test_rejects_shoe_rules(self):
+        setupB = GameSetup()
+        setupB.playerChooseNumDecks = 2
+        with self.assertRaises(ValueError):
+            replay(recorded_shoes(6, 2), GameSetup(), setupB)
+
+if __name__ == '__main__':
+    unittest.main()
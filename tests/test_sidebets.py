@@ -0,0 +1,85 @@
+import itertools
+import math
+import unittest
+from collections import Counter
+
+from blackjack.core import Deck
+from blackjack.sidebets import (LUCKY_LADIES_PAYTABLE, PERFECT_PAIRS_PAYTABLE, TWENTY_ONE_THREE_PAYTABLE, SideBetOdds,
+                                lucky_ladies_result, perfect_pairs_result, twenty_one_three_result)
+
+def ordered_draws(counts, cards):
+    # Ways to draw these cards in this order from a shoe holding counts of each card
+    ways = 1
+    for card, wanted in Counter(cards).items():
+        ways *= math.perm(counts[card], wanted)
+    return ways
+
+def enumerated_probabilities(deck, size, result, categories):
+    # Every ordered draw of size cards from what is left in the shoe, settled by the same function the game pays with
+    counts = Counter(deck.remaining_cards())
+    total = sum(counts.values())
+    wins = dict.fromkeys(categories, 0)
+    for cards in itertools.product(counts, repeat=size):
+        ways = ordered_draws(counts, cards)
+        if ways:
+            category = result(list(cards))
+            if category:
+                wins[category] += ways
+    return {category: wins / math.perm(total, size) for category, wins in wins.items()}
+
+def enumerated_lucky_ladies(deck):
+    # The Queen of Hearts pair pays more when the dealer then has blackjack, so those pairs also go through every
+    # dealer hand that can follow them
+    counts = Counter(deck.remaining_cards())
+    total = sum(counts.values())
+    wins = dict.fromkeys(LUCKY_LADIES_PAYTABLE, 0)
+    for player in itertools.product(counts, repeat=2):
+        ways = ordered_draws(counts, player)
+        category = lucky_ladies_result(list(player), False) if ways else None
+        if category != 'queen_hearts':
+            if category:
+                wins[category] += ways
+            continue
+        left = counts - Counter(player)
+        for dealer in itertools.product(left, repeat=2):
+            dealerWays = ordered_draws(left, dealer)
+            if dealerWays:
+                blackjack = sorted(Deck.values[card.rank] for card in dealer) == [10, 11]
+                wins[lucky_ladies_result(list(player), blackjack)] += ways * dealerWays / math.perm(total - 2, 2)
+    return {category: wins / math.perm(total, 2) for category, wins in wins.items()}
+
+class SideBetOddsTest(unittest.TestCase):
+    def check(self, odds, deck):
+        checks = (
+            (odds.perfect_pairs_probabilities(), enumerated_probabilities(deck, 2, perfect_pairs_result, PERFECT_PAIRS_PAYTABLE)),
+            (odds.twenty_one_three_probabilities(), enumerated_probabilities(deck, 3, twenty_one_three_result, TWENTY_ONE_THREE_PAYTABLE)),
+            (odds.lucky_ladies_probabilities(), enumerated_lucky_ladies(deck)),
+        )
+        for tracked, enumerated in checks:
+            self.assertEqual(tracked.keys(), enumerated.keys())
+            for category in tracked:
+                self.assertAlmostEqual(tracked[category], enumerated[category], places=12, msg=category)
+
+    def test_full_shoe(self):
+        deck = Deck(2, 1.0, seed=4)
+        deck.shuffle_deck()
+        self.check(SideBetOdds(deck), deck)
+
+    def test_tracked_card_by_card(self):
+        # The counts are only updated as cards are drawn, never rebuilt, so any slip in card_drawn shows up here
+        deck = Deck(2, 1.0, seed=5)
+        odds = SideBetOdds(deck)
+        deck.shuffle_deck()
+        for dealt in range(1, 61):
+            deck.draw_card()
+            if dealt % 20 == 0:
+                self.check(odds, deck)
+
+    def test_six_deck_perfect_pairs(self):
+        # The published house edge of the 25/12/6 paytable dealt from six decks
+        deck = Deck(6, 1.0)
+        deck.shuffle_deck()
+        self.assertAlmostEqual(SideBetOdds(deck).perfect_pairs_ev(), -0.0611, places=4)
+
+if __name__ == '__main__':
+    unittest.main()
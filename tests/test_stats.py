@@ -0,0 +1,91 @@
+import random
+import unittest
+
+from blackjack.core import GameSetup
+from blackjack.simulation import iter_rounds
+from blackjack.stats import BankrollTrajectory, Histogram, QuantileSketch, RunningStats, SimulationStats
+
+def chunks(values, sizes):
+    start = 0
+    for size in sizes:
+        yield values[start:start + size]
+        start += size
+
+def merged(factory, values, sizes):
+    # One accumulator per chunk, merged in order, as the workers' results are
+    total = factory()
+    for chunk in chunks(values, sizes):
+        part = factory()
+        for value in chunk:
+            part.add(value)
+        total.merge(part)
+    return total
+
+def single_pass(factory, values):
+    total = factory()
+    for value in values:
+        total.add(value)
+    return total
+
+class MergeTest(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(1)
+        self.values = [rng.choice((-2, -1, -1, -0.5, 0, 1, 1, 1.5, 2, 4)) * rng.random() * 3 for _ in range(5000)]
+        self.sizes = [0, 1, 999, 2000, 0, 1500, 500]
+
+    def test_running_stats(self):
+        whole = single_pass(RunningStats, self.values)
+        parts = merged(RunningStats, self.values, self.sizes)
+        self.assertEqual(parts.count, whole.count)
+        self.assertAlmostEqual(parts.total, whole.total, places=9)
+        self.assertAlmostEqual(parts.mean, whole.mean, places=12)
+        self.assertAlmostEqual(parts.variance, whole.variance, places=9)
+        self.assertEqual((parts.minimum, parts.maximum), (whole.minimum, whole.maximum))
+
+    def test_histogram(self):
+        factory = lambda: Histogram(-4, 4, 16)
+        whole = single_pass(factory, self.values)
+        parts = merged(factory, self.values, self.sizes)
+        self.assertEqual((parts.counts, parts.underflow, parts.overflow), (whole.counts, whole.underflow, whole.overflow))
+        with self.assertRaises(ValueError):
+            parts.merge(Histogram(-4, 4, 8))
+
+    def test_quantile_sketch(self):
+        whole = single_pass(QuantileSketch, self.values)
+        parts = merged(QuantileSketch, self.values, self.sizes)
+        ordered = sorted(self.values)
+        for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+            self.assertEqual(parts.quantile(q), whole.quantile(q))
+            exact = ordered[int(q * (len(ordered) - 1))]
+            self.assertLessEqual(abs(parts.quantile(q) - exact), abs(exact) * parts.relativeAccuracy + 1e-12)
+
+    def test_bankroll_trajectory(self):
+        whole = single_pass(BankrollTrajectory, self.values)
+        parts = merged(BankrollTrajectory, self.values, self.sizes)
+        self.assertAlmostEqual(parts.final, whole.final, places=9)
+        self.assertAlmostEqual(parts.peak, whole.peak, places=9)
+        self.assertAlmostEqual(parts.trough, whole.trough, places=9)
+        self.assertAlmostEqual(parts.maxDrawdown, whole.maxDrawdown, places=9)
+
+    def test_simulation_stats(self):
+        results = list(iter_rounds(GameSetup(), 3000, seed=3))
+        whole = single_pass(SimulationStats, results)
+        parts = merged(SimulationStats, results, [1000, 1000, 1000])
+        wholeSummary = whole.summary()
+        partsSummary = parts.summary()
+        for name in ('rounds', 'net', 'wagered', 'outcomes'):
+            self.assertEqual(partsSummary[name], wholeSummary[name])
+        self.assertAlmostEqual(partsSummary['ev'], wholeSummary['ev'], places=12)
+        self.assertAlmostEqual(partsSummary['max_drawdown'], wholeSummary['max_drawdown'], places=9)
+
+    def test_outcomes_are_counted_per_hand(self):
+        # A split round counts each of its hands, so there are more outcomes than rounds
+        stats = SimulationStats()
+        for result in iter_rounds(GameSetup(), 3000, seed=3):
+            stats.add(result)
+            if result.action != 'surrender':
+                self.assertGreaterEqual(result.handsWon + result.handsPushed + result.handsLost, 1)
+        self.assertGreater(sum(stats.outcomes.values()), stats.rounds)
+
+if __name__ == '__main__':
+    unittest.main()